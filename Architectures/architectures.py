@@ -98,6 +98,120 @@ class VS_SM_hip(nn.Module):
         x2 = torch.max(x, dim=-1,)
         return x, bric
 
+class GroupedConv1d(nn.Module):
+    """
+    M trained Conv1d layers of the same shape evaluated in one pass.
+    Input and output are shaped (M, batch, channels, time); each kernel tap is a batched matmul over the model axis.
+    """
+    def __init__(self, convs):
+        super().__init__()
+        self.kernel_size = convs[0].kernel_size[0]
+        self.padding = convs[0].padding[0]
+        weight = torch.stack([conv.weight.detach() for conv in convs])  # (M, out, in, k)
+        self.register_buffer("weight", weight.permute(3, 0, 1, 2).unsqueeze(2).contiguous())  # (k, M, 1, out, in)
+        self.register_buffer("bias", torch.stack([conv.bias.detach() for conv in convs])[:, None, :, None])
+
+    def forward(self, x):
+        length = x.shape[-1]
+        if self.padding:
+            x = nn.functional.pad(x, (self.padding, self.padding))
+        out = torch.matmul(self.weight[0], x[..., :length])
+        for k in range(1, self.kernel_size):
+            out += torch.matmul(self.weight[k], x[..., k:k + length])
+        return out.add_(self.bias)
+
+
+class GroupedBatchNorm1d(nn.Module):
+    """
+    M trained BatchNorm1d layers (inference statistics) folded into one scale and shift, input (M, batch, channels, time)
+    """
+    def __init__(self, batch_norms):
+        super().__init__()
+        scale = torch.stack([bn.weight.detach() / torch.sqrt(bn.running_var + bn.eps) for bn in batch_norms])
+        shift = torch.stack([bn.bias.detach() for bn in batch_norms]) - \
+            torch.stack([bn.running_mean for bn in batch_norms]) * scale
+        self.register_buffer("scale", scale[:, None, :, None])
+        self.register_buffer("shift", shift[:, None, :, None])
+
+    def forward(self, x):
+        return torch.addcmul(self.shift, x, self.scale)
+
+
+class GroupedLSTM(nn.Module):
+    """
+    M trained batch_first LSTMs, each over its own slice of the model axis with its native recurrence.
+    Input (M, batch, time, features), output (M, batch, time, directions * hidden) as in nn.LSTM.
+    """
+    def __init__(self, lstms):
+        super().__init__()
+        self.lstms = nn.ModuleList(lstms)
+
+    def forward(self, x):
+        return torch.stack([lstm(x[i])[0] for i, lstm in enumerate(self.lstms)])
+
+
+class VS_SM_stacked(nn.Module):
+    """
+    Inference-only stack of M trained VS_SM nets sharing one input.
+    Input (batch, 3, time), output (M, batch, 1, time) where out[i] equals nets[i](x).
+    """
+    def __init__(self, nets):
+        super().__init__()
+        self.n_models = len(nets)
+        for i in range(1, 13):
+            setattr(self, f"conv{i}", GroupedConv1d([getattr(net, f"conv{i}") for net in nets]))
+        self.batchNorm1 = GroupedBatchNorm1d([net.batchNorm1 for net in nets])
+        self.lstm1 = GroupedLSTM([net.lstm1 for net in nets])
+        self.batchNorm2 = GroupedBatchNorm1d([net.batchNorm2 for net in nets])
+        self.lstm2 = GroupedLSTM([net.lstm2 for net in nets])
+
+    def backbone(self, x):
+        x = x.expand(self.n_models, -1, -1, -1)
+        for i in range(1, 6):
+            x = nn.functional.leaky_relu_(getattr(self, f"conv{i}")(x))
+        x = self.batchNorm1(x)
+        x = self.lstm1(x.transpose(2, 3)).transpose(2, 3)
+        for i in range(6, 9):
+            x = nn.functional.leaky_relu_(getattr(self, f"conv{i}")(x))
+        x = self.batchNorm2(x)
+        x = self.lstm2(x.transpose(2, 3)).transpose(2, 3)
+        return x
+
+    def forward(self, x):
+        x = self.backbone(x)
+        for i in range(9, 12):
+            x = nn.functional.leaky_relu_(getattr(self, f"conv{i}")(x))
+        return nn.functional.relu(self.conv12(x))
+
+
+class VS_SM_hip_stacked(VS_SM_stacked):
+    """
+    Inference-only stack of M trained VS_SM_hip nets sharing one input.
+    Input (batch, 3, time), output ((M, batch, 1, time), (M, batch, 1)) where (out[0][i], out[1][i]) equals nets[i](x).
+    """
+    def __init__(self, nets):
+        nn.Module.__init__(self)
+        self.n_models = len(nets)
+        for name in ["conv%d" % i for i in range(1, 13)] + ["conv9_1"]:
+            setattr(self, name, GroupedConv1d([getattr(net, name) for net in nets]))
+        self.batchNorm1 = GroupedBatchNorm1d([net.batchNorm1 for net in nets])
+        self.lstm1 = GroupedLSTM([net.lstm1 for net in nets])
+        self.batchNorm2 = GroupedBatchNorm1d([net.batchNorm2 for net in nets])
+        self.lstm2 = GroupedLSTM([net.lstm2 for net in nets])
+        self.register_buffer("fc9_1_weight", torch.stack([net.fc9_1.weight.detach().t() for net in nets]))
+        self.register_buffer("fc9_1_bias", torch.stack([net.fc9_1.bias.detach() for net in nets])[:, None])
+
+    def forward(self, x):
+        x = self.backbone(x)
+        bric = nn.functional.leaky_relu_(self.conv9_1(x))
+        bric = bric.reshape(bric.size(0), bric.size(1), -1)
+        bric = nn.functional.relu(torch.baddbmm(self.fc9_1_bias, bric, self.fc9_1_weight))
+        for i in range(9, 12):
+            x = nn.functional.leaky_relu_(getattr(self, f"conv{i}")(x))
+        x = nn.functional.relu(self.conv12(x))
+        return x, bric
+
+
 class Damages_model(nn.Module):
     def __init__(self):
         super().__init__()
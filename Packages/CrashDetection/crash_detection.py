@@ -1,12 +1,13 @@
 import os
 import sys
+import threading
 import torch
 import numpy as np
 import pandas as pd
 import architectures
 import bottleneck as bn
 
-from SignalProcessing import SignalProcessing as sp
+from SignalProcessing import PreparedEvent
 from scipy.special import expit as sigmoid
 from Utils import IO, DSLogger, LogLevel
 from CrashDetection.crash_mechanism import CrashMechanism 
@@ -14,7 +15,10 @@ from CrashDetection.pothole_indicator import Pothole_Indicator
 
 
 class CrashDetection:
-    def __init__(self, basefolder, all_signal_not_rot, calib_info_obj, OffSet):
+    __ResidentModels = dict()  # static, model path -> loaded crash model
+    __Lock = threading.Lock()
+
+    def __init__(self, basefolder, all_signal_not_rot, calib_info_obj, OffSet, prepared_event=None):
         self.logger = DSLogger("crash_det")
         self.basefolder = basefolder
         self.crash_config = IO.read_config(self.basefolder, 'crash')
@@ -24,10 +28,12 @@ class CrashDetection:
         self.logger.PrintLog(LogLevel.Info, f"calib_obj: {calib_info_obj}")
         self.logger.PrintLog(LogLevel.Info, f"OffSet: {OffSet}")
 
-        self.all_signal_not_rot_copy = all_signal_not_rot.copy(deep=True)
-        self.all_signal = sp.rotate_signal(self.all_signal_not_rot_copy, calib_info_obj["OperationalMat"], "FRD",
-                                           calib_info_obj["AxesOrientation"], self.crash_config["all_acc_columns"],
-                                           OffSet)
+        if prepared_event is None:
+            prepared_event = PreparedEvent(all_signal_not_rot, calib_info_obj, OffSet)
+        self.prepared_event = prepared_event
+        # shared with the other packages, only read here
+        self.all_signal_not_rot_copy = prepared_event.raw
+        self.all_signal = prepared_event.rotated(self.crash_config["all_acc_columns"])
         self.calib_info = calib_info_obj
         self.device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
         self.sample_rate = self.crash_config["sample_rate"]
@@ -62,7 +68,7 @@ class CrashDetection:
                                         , axis=0, ignore_index=True)
 
     def findThreeSignals(self, data):
-        data = data.to_numpy().astype("float32")[:, :-1]
+        data = data.to_numpy().astype("float32", copy=False)[:, :-1]
         peak_len = self.crash_config["sample_rate"] * 1
         peak_shift = self.crash_config["peak_shift_right"]
         move_min_win = self.crash_config["move_win_len"]
@@ -87,18 +93,37 @@ class CrashDetection:
         data2 = data[start_ind2: end_ind2, :]
         return (data1, data2, data), event_indexes
 
+    @classmethod
+    def get_resident_model(cls, basefolder, crash_config=None):
+        """
+        loads the crash model once per process and keeps it for the following events
+        :return: crash model in eval mode
+        """
+        if crash_config is None:
+            crash_config = IO.read_config(basefolder, 'crash')
+        model_path = os.path.abspath(os.path.join(basefolder, "Models", "crash_models",
+                                                  crash_config["multi_input_model"] + ".pt"))
+        with cls.__Lock:
+            if model_path not in cls.__ResidentModels:
+                device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
+                model = eval(f"architectures.{crash_config['multi_input_model']}()")
+                model.to(device)
+                state_dict = torch.load(model_path, map_location=lambda storage, loc: storage)
+                model.load_state_dict(state_dict)
+                model.eval()
+                cls.__ResidentModels[model_path] = model
+            return cls.__ResidentModels[model_path]
+
     def load_multi_input_model(self):
-        self.model = eval(f"architectures.{self.crash_config['multi_input_model']}()")
-        self.model.to(self.device)
-        model_path = os.path.join(self.basefolder, "Models", "crash_models",
-                                  self.crash_config["multi_input_model"] + ".pt")
-        state_dict = torch.load(model_path, map_location=lambda storage, loc: storage)
-        self.model.load_state_dict(state_dict)
+        self.model = self.get_resident_model(self.basefolder, self.crash_config)
 
     def prediction_for_multi_input(self, data):
         self.load_multi_input_model()
         self.model.eval()
-        inp_data = [torch.from_numpy(inp_data.T.reshape(1, 2, -1)).to(self.device).float() for inp_data in data]
+        # channels first and contiguous, as in prediction_for_multi_input_batch, so the output does not depend on
+        # the memory layout of the crops
+        inp_data = [torch.from_numpy(np.ascontiguousarray(inp_data.T).reshape(1, 2, -1)).to(self.device).float()
+                    for inp_data in data]
         _, output = self.model(inp_data)
         output = output.detach().cpu().numpy()
         self.logger.PrintLog(LogLevel.Info, f"model_output: {output}")
@@ -106,6 +131,36 @@ class CrashDetection:
         crash = True if crash_prob > self.crash_config["probability_threshold"] else False
         return crash, crash_prob
 
+    @classmethod
+    def prediction_for_multi_input_batch(cls, basefolder, batch_data, crash_config=None, batch_size=256):
+        """
+        crash prediction of many events with the resident model, batch_size events per forward pass
+        :param batch_data: list of findThreeSignals crops (data1, data2, data3), one per event, with the same
+                           crop lengths for every event
+        :return: (crash [bool array (B,)], crash_prob [float array (B,)])
+        """
+        if crash_config is None:
+            crash_config = IO.read_config(basefolder, 'crash')
+        model = cls.get_resident_model(basefolder, crash_config)
+        device = next(model.parameters()).device
+        crash_prob = np.zeros(len(batch_data))
+        for start in range(0, len(batch_data), batch_size):
+            chunk = batch_data[start:start + batch_size]
+            # one (B, 2, L) tensor per branch of the model
+            inp_data = [torch.from_numpy(np.stack([data[branch].T for data in chunk])).to(device).float()
+                        for branch in range(3)]
+            with torch.no_grad():
+                _, output = model(inp_data)
+            crash_prob[start:start + len(chunk)] = output[:, 1].cpu().numpy()
+        return crash_prob > crash_config["probability_threshold"], crash_prob
+
+    def multi_input_signals(self):
+        """
+        :return: ((data1, data2, data3), event_indexes) - the crops fed to the crash model
+        """
+        self.alignSignal()
+        return self.findThreeSignals(self.all_signal)
+
     def calc_delta_v_xy(self, df, sig_fs=200):
         df_tr = pd.DataFrame()
         for col in df.loc[:, self.acc_columns]:
@@ -115,7 +170,8 @@ class CrashDetection:
         return df_tr
 
     def calc_maxG(self, df):
-        maxX, maxY, maxZ = df[self.crash_config["all_acc_columns"]].abs().max(axis=0).round(2).to_numpy()
+        maxG = df[self.crash_config["all_acc_columns"]].abs().max(axis=0).astype(float)
+        maxX, maxY, maxZ = maxG.round(2).to_numpy()
         return maxX, maxY, maxZ
 
     @staticmethod
@@ -153,10 +209,10 @@ class CrashDetection:
                 result["maxG"] = {"X": maxX, "Y": maxY, "Z": maxZ}
                 return result                               
 
-            self.alignSignal()
-            signals, indexes = self.findThreeSignals(self.all_signal)
+            signals, indexes = self.multi_input_signals()
             self.logger.PrintLog(LogLevel.Info, f"ind_start: {indexes[0]}, ind_end: {indexes[-1]}")
-            self.xyz_section = self.all_signal.iloc[indexes[0]: indexes[-1], :].copy(deep=True)
+            # the crash statistics (mechanism, delta-v, max G) are computed in float64 whatever the signal dtype
+            self.xyz_section = self.all_signal.iloc[indexes[0]: indexes[-1], :].astype(float)
             self.logger.PrintLog(LogLevel.Info, "getting crash prediction")
             is_crash, result["confidence"] = self.prediction_for_multi_input(signals)
 
@@ -1,12 +1,27 @@
 import os
 import numpy as np
 import pandas as pd
+from functools import lru_cache
+from scipy import fft as sfft
 from SignalProcessing import SignalProcessing as sp
 from Utils import DSLogger, LogLevel
 
+
+@lru_cache(maxsize=32)
+def _lowpass_bank_rfft(fs, cutoffs, nCoeff, nfft):
+    # rfft of the low pass taps of all the cutoffs (~0.4 MB each), read-only so no caller can alter the cached copy
+    taps = np.stack([sp.create_lpf(fs, cutoff, nCoeff) for cutoff in cutoffs])
+    bank = sfft.rfft(taps, n=nfft, axis=-1)
+    bank.flags.writeable = False
+    return bank
+
+
 class CrashMechanism:
     """NOTE: if the highest peak of the provided signal falls at the end of the 5 seconds
     it's always going to return rear, rare edge case where the signal would have to remain above the thr for 5 sec"""
+    # lower edges of the mechanism sectors in degrees, see mechanism_classifier
+    MECHANISM_EDGES = np.array([45, 135, 230, 315])
+    MECHANISM_SECTORS = np.array(['Rear', 'SideLeft', 'Frontal', 'SideRight', 'Rear'])
 
     @classmethod
     def get_mechanism(cls, df, config):
@@ -29,6 +44,32 @@ class CrashMechanism:
 
         return mechanism, mean_angle
 
+    @classmethod
+    def filter_bank(cls, fs, cutoffs, nCoeff, length):
+        """
+        low pass FIRs of all the cutoffs in the frequency domain, designed once per (fs, cutoffs, nCoeff, nfft) -
+        the event lengths sharing an FFT size share the bank, the least recently used banks are dropped
+        :return: (nfft, [n_cutoffs, nfft // 2 + 1] rfft of the taps)
+        """
+        nfft = sfft.next_fast_len(length + nCoeff - 1, real=True)
+        return nfft, _lowpass_bank_rfft(fs, tuple(cutoffs), nCoeff, nfft)
+
+    @classmethod
+    def lowpass_bank(cls, signal, fs, cutoffs, nCoeff=None):
+        """
+        same as sp.smooth_dataset_filter at every cutoff, in a single FFT pass
+        :param signal: [T, n_axes] array
+        :return: [n_cutoffs, T, n_axes] array
+        """
+        length = signal.shape[0]
+        if nCoeff is None:
+            nCoeff = min(512, length // 2 * 2)
+        nfft, bank = cls.filter_bank(fs, cutoffs, nCoeff, length)
+        full = sfft.irfft(bank[:, :, None] * sfft.rfft(signal, n=nfft, axis=0)[None], n=nfft, axis=1)
+        # np.convolve 'same' keeps the center of the full convolution
+        start = (nCoeff - 1) // 2
+        return full[:, start:start + length, :]
+
     @classmethod
     def angles_per_lowpass(cls, df, fs, cutoff_min, cutoff_max, cutoff_steps, sensors=['Acc_X', 'Acc_Y']):
         """
@@ -38,29 +79,18 @@ class CrashMechanism:
         :param sensors: list of vehicle sensors
         :return: list of positive angles between 0 and 360 degrees
         """
-
-        # explicitly save a copy before making changes to df to be sure
-        df = df.copy(deep=True)
-        dft = sp.insert_time_column(df.loc[:, sensors], sigFs=int(fs))
-
-        angles = []
-        for cutoff in range(cutoff_min, cutoff_max, cutoff_steps):
-            # smooth_dataset_filter returns a deep copy, so the lowpass is always on the original dft
-            dfs = sp.smooth_dataset_filter(dft, cutoff)
-            norm = np.linalg.norm(dfs.loc[:, sensors], axis=1)
-            max_norm_ind = np.argmax(norm)
-
-            # arctan2 returns angles in rad between [-pi ; pi]
-            thetas_win_rad = np.arctan2(dfs[sensors[1]].values, dfs[sensors[0]].values)  # could do it just for max
-            angle_rad = thetas_win_rad[
-                max_norm_ind]  # rads are needed for the mean at the end, degrees are needed for mech pred
-
-            # convert angle to positive angle between [0 ; 360] degrees
-            angle_deg = cls.rad_to_pos_deg(angle_rad)
-
-            angles.append(angle_deg)
-
-        return np.array(angles)
+        signal = df.loc[:, sensors].to_numpy(dtype=float)
+        # the filters are designed at the rate smooth_dataset_filter reads back from the time column
+        filter_fs = sp.calc_fs(df.index.to_numpy()[:, None] / int(fs))
+        cutoffs = list(range(cutoff_min, cutoff_max, cutoff_steps))
+        filtered = cls.lowpass_bank(signal, filter_fs, cutoffs)
+
+        # direction of the max norm sample of every cutoff
+        max_norm_ind = np.argmax(np.linalg.norm(filtered, axis=2), axis=1)
+        peaks = filtered[np.arange(len(cutoffs)), max_norm_ind]
+        # arctan2 returns angles in rad between [-pi ; pi], converted to positive angles between [0 ; 360] degrees
+        angles = np.arctan2(peaks[:, 1], peaks[:, 0]) * 180 / np.pi
+        return np.where(angles < 0, angles + 360, angles)
 
     @classmethod
     def mechanism_voter(cls, angles_list):
@@ -68,15 +98,11 @@ class CrashMechanism:
         :param angles_list: receives list of positive angles
         :return: mechanism_pred, agreement_perc
         """
-        mech_count = {}
-        for theta in angles_list:
-            mech = cls.mechanism_classifier(theta)
-            if mech in mech_count.keys():
-                mech_count[mech] += 1
-            else:
-                mech_count[mech] = 1
-        mech_ranked = [(k, v) for k, v in sorted(mech_count.items(), key=lambda item: item[1], reverse=True)]
-        return mech_ranked[0][0], round(mech_ranked[0][1] / len(angles_list), 3)
+        mechs = cls.MECHANISM_SECTORS[np.searchsorted(cls.MECHANISM_EDGES, np.asarray(angles_list), side='right')]
+        # ties go to the mechanism voted first, like the ranking of the insertion ordered counts
+        names, first, counts = np.unique(mechs, return_index=True, return_counts=True)
+        order = np.lexsort((first, -counts))
+        return str(names[order[0]]), round(counts[order[0]] / len(mechs), 3)
 
     @staticmethod
     def rad_to_pos_deg(angle_rad):
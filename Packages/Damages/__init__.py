@@ -1,2 +1,3 @@
 from Damages.damages import DamagesPrediction
 from Damages.post_processing import PostProcessing
+from Damages.damages_config import DamagesConfig
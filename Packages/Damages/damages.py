@@ -1,63 +1,66 @@
 import os
+import threading
 import torch
-from SignalProcessing import SignalProcessing as sp
+from SignalProcessing import PreparedEvent
 import numpy as np
-import pandas as pd
 import traceback
 import copy
 import architectures
-from Utils import IO, LogLevel, DSLogger
+from Utils import LogLevel, DSLogger
 import Damages
+from Damages.damages_config import DamagesConfig
 
 
 class DamagesPrediction:
-    def __init__(self, base_folder, signal, calib_info_obj, crash_info_obj, OffSet, car_type=None):
+    __ResidentModels = dict()  # static, model path -> loaded damages model
+    __Lock = threading.Lock()
+
+    def __init__(self, base_folder, signal, calib_info_obj, crash_info_obj, OffSet, car_type=None,
+                 prepared_event=None):
         self.logger = DSLogger("Damages_log")
         self.logger.PrintLog(LogLevel.Info, "Damages: module initialization")
         self.base_folder = base_folder
-        self.signal = signal.copy(deep=True)
-        self.op_matrix = np.array(calib_info_obj["OperationalMat"])
-        self.axes_directions = calib_info_obj["AxesOrientation"]
-        self.offset = OffSet
+        self.prepared_event = prepared_event if prepared_event is not None else \
+            PreparedEvent(signal, calib_info_obj, OffSet)
         self.mechanism = crash_info_obj["mechanism"]
         self.theta = crash_info_obj["theta"]
         self.DV = copy.deepcopy(crash_info_obj["DV"])
         self.car_type = car_type
         self.package_name = os.path.split(os.path.dirname(__file__))[-1]
-        self.params = IO.read_config(self.base_folder, self.package_name)
-        self.net_arch = self.params['architecture']
+        self.config = DamagesConfig.get(self.base_folder)
+        self.params = self.config.params
         self.device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
 
-    def get_net(self):
-        self.logger.PrintLog(LogLevel.Info, "Start getting net")
-        self.net = eval('architectures.' + self.net_arch + '()').to(self.device)
-        self.logger.PrintLog(LogLevel.Info, "Net was gotten")
+    @classmethod
+    def get_resident_model(cls, base_folder, params=None):
+        """
+        loads the damages net once per process and keeps it for the following events
+        :return: damages net in eval mode
+        """
+        if params is None:
+            params = DamagesConfig.get(base_folder).params
+        model_path = os.path.abspath(os.path.join(base_folder, "Models", "Damages_models", "damage_regression.pth"))
+        with cls.__Lock:
+            if model_path not in cls.__ResidentModels:
+                device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
+                net = eval('architectures.' + params['architecture'] + '()').to(device)
+                state_dict = torch.load(model_path, map_location=lambda storage, loc: storage)
+                net.load_state_dict(state_dict)
+                net.eval()
+                cls.__ResidentModels[model_path] = net
+            return cls.__ResidentModels[model_path]
 
     def load_model(self):
         self.logger.PrintLog(LogLevel.Info, "Start loading model")
-        self.net.to(self.device)
-        model_path = os.path.join(self.base_folder, "Models", "Damages_models", "damage_regression.pth")
-        state_dict = torch.load(model_path, map_location=lambda storage, loc: storage)
-        self.net.load_state_dict(state_dict)
+        self.net = self.get_resident_model(self.base_folder, self.params)
         self.logger.PrintLog(LogLevel.Info, "Model was loaded")
 
     def preprocess(self):
         self.logger.PrintLog(LogLevel.Info, "Start preprocess signal")
         fs = self.params.get('InFs', 200)
         outFs = self.params.get('OutFs', 200)
-        self.signal = self.signal[['Acc_X', 'Acc_Y', 'Acc_Z']]
-        self.signal = sp.rotate_signal(self.signal, self.op_matrix, output_orientation="FRD",
-                                       input_orientation=self.axes_directions, sensors=['Acc_X', 'Acc_Y', 'Acc_Z'],
-                                       offset=self.offset)
-
-        self.signal = self.signal.rename(columns={'Acc_X': 'X', 'Acc_Y': 'Y', 'Acc_Z': 'Z'})
-        self.signal = self.signal[["X", "Y"]]
-        self.signal = sp.insert_time_column(self.signal, sigFs=fs)
-        if outFs != fs:
-            self.signal, _ = sp.change_sampling_rate(self.signal, outFs=outFs)
-        self.signal = sp.smooth_dataset_filter(self.signal, cutoffFreq=self.params["cutoffFreq"])
-        self.signal = sp.alignment_signal(self.signal, size=self.params["signal_length"])
-        self.signal = self.signal.to_numpy()[:, 1:]
+        self.signal = self.prepared_event.aligned_array(self.params["signal_length"], self.params["cutoffFreq"], fs,
+                                                        outFs, columns=('X', 'Y'))
         self.signal = self.signal.reshape(-1, self.signal.shape[0], self.signal.shape[1]).transpose(0, 2, 1)
         self.logger.PrintLog(LogLevel.Info, "Finish preprocess signal")
 
@@ -67,14 +70,9 @@ class DamagesPrediction:
         self.net.eval()
         output = self.net(input)
         output = output.data.cpu().numpy()
-        Width = self.params["cells_dict"]["W"]
-        Length = self.params["cells_dict"]["L"]
-        levels = self.params["cells_dict"]["levels"]
-        cells = ["Cell_" + w + "_" + str(l) + "_" + level for w in Width for l in Length for level in levels]
-        output = 1 * (output > self.params.get("deform_threshold", 30))
-        self.result = pd.DataFrame(output, columns=cells).to_dict(orient='index')[0]
-        self.result = set([k for k, v in self.result.items() if v == 1])
-        post_process = Damages.PostProcessing(self.result, self.params, self.mechanism, theta=self.theta)
+        # the output is in the cells order of the config, W x L x levels
+        self.result = (output[0] > self.config.threshold).reshape(self.config.shape)
+        post_process = Damages.PostProcessing(self.result, self.config, self.mechanism, theta=self.theta)
         final_result = post_process.run()
         self.logger.PrintLog(LogLevel.Info, "Damage was predicted")
         return final_result
@@ -104,7 +102,6 @@ class DamagesPrediction:
     def run(self):
         try:
             self.logger.PrintLog(LogLevel.Info, "Damages: run predictions")
-            self.get_net()
             self.load_model()
             self.preprocess()
             result_dict = self.damage_prediction()
@@ -0,0 +1,120 @@
+import os
+import json
+import math
+import threading
+import numpy as np
+from Utils import IO
+
+
+def _read_only(array):
+    array.setflags(write=False)
+    return array
+
+
+class DamagesConfig:
+    """
+    Damages config compiled once per process: the cells grid (names, index), the post-process angle intervals with a
+    1 degree lookup table, the parsed edge cells and the lines / masks of every mechanism.
+    Shared between the events and threads - treat it as immutable, the arrays are read-only.
+    """
+    __Configs = dict()  # static, config path -> compiled config
+    __Lock = threading.Lock()
+    SIDE_AXIS = {"Frontal": "L", "Rear": "L", "SideLeft": "W", "SideRight": "W"}  # axis the mechanism lines run on
+    CORNER_ROWS = {"Frontal": ("A", "F"), "SideLeft": ("F",), "SideRight": ("A",)}  # A_1 / F_1 moved to A_2 / F_2
+    EDGE_INNER = {"A": "B", "F": "E"}  # an edge cell without damage on the inner row clears its row
+
+    def __init__(self, params):
+        """
+        :param params: Damages config as read by IO.read_config
+        """
+        self.params = params
+        cells_dict = params["cells_dict"]
+        self.W = tuple(cells_dict["W"])
+        self.L = tuple(cells_dict["L"])
+        self.levels = tuple(cells_dict["levels"])
+        self.low = self.levels.index("Low")
+        self.high = self.levels.index("High")
+        self.shape = (len(self.W), len(self.L), len(self.levels))
+        self.threshold = params.get("deform_threshold", 30)
+        # the order of the model output
+        self.cell_names = _read_only(np.array(["Cell_" + w + "_" + str(l) + "_" + level for w in self.W
+                                               for l in self.L for level in self.levels]).reshape(self.shape))
+        self.cell_index = {name: i for i, name in enumerate(self.cell_names.ravel())}
+
+        self.mechanism_lines = dict()  # mechanism -> indices of its lines (mechanism_dict order) on its axis
+        self.mechanism_masks = dict()  # mechanism -> [W, L, level] mask of the cells on its lines
+        for mechanism, lines in params["mechanism_dict"].items():
+            axis = self.L if self.SIDE_AXIS[mechanism] == "L" else self.W
+            indices = tuple(axis.index(line) for line in lines)
+            mask = np.zeros(self.shape, dtype=bool)
+            if self.SIDE_AXIS[mechanism] == "L":
+                mask[:, list(indices)] = True
+            else:
+                mask[list(indices)] = True
+            self.mechanism_lines[mechanism] = indices
+            self.mechanism_masks[mechanism] = _read_only(mask)
+
+        L = np.array(self.L)
+        self.corner_cols = (self.L.index(1), self.L.index(2))
+        self.corner_rows = {k: tuple(self.W.index(w) for w in v) for k, v in self.CORNER_ROWS.items()}
+        self.corner_clear_rows = (self.W.index("A"), self.W.index("F"))
+        self.post_process_dict = dict()  # (low, high] interval -> {"edge", "mechanisms"}
+        self.edge_cells = dict()  # (low, high] interval -> parsed edge cells
+        for k, v in params["post_process_dict"].items():
+            interval = tuple(json.loads("[" + k.strip("()") + "]"))
+            edge_cells = []
+            for cell in v["edge"]:
+                w, l = cell.split("_")
+                if w in self.EDGE_INNER:
+                    # (row, column, inner row, columns cleared): A_2 / F_2 clear L >= 2, the others L <= 12
+                    cleared = _read_only(L >= 2 if "_2" in cell else L <= 12)
+                    edge_cells.append((self.W.index(w), self.L.index(int(l)), self.W.index(self.EDGE_INNER[w]),
+                                       cleared))
+            self.post_process_dict[interval] = v
+            self.edge_cells[interval] = tuple(edge_cells)
+        self.intervals = tuple(self.post_process_dict.keys())
+        # interval of (k, k + 1] degrees at k, valid when the bounds are whole degrees
+        self.angle_lut = None
+        if all(float(b).is_integer() for interval in self.intervals for b in interval):
+            self.angle_lut = tuple(self.scan_interval(k + 0.5) for k in range(360))
+
+    @classmethod
+    def get(cls, base_folder):
+        """
+        :param base_folder: basefolder
+        :return: compiled config of base_folder/config/Damages_config.json, read on first call
+        """
+        package_name = os.path.split(os.path.dirname(__file__))[-1]
+        key = os.path.abspath(os.path.join(base_folder, 'config', package_name + '_config.json'))
+        with cls.__Lock:
+            if key not in cls.__Configs:
+                cls.__Configs[key] = cls(IO.read_config(base_folder, package_name))
+            return cls.__Configs[key]
+
+    def scan_interval(self, theta):
+        for k in self.intervals:
+            if k[0] < k[1]:
+                if k[0] < theta <= k[1]:
+                    return k
+            elif k[0] < theta or theta <= k[1]:
+                return k
+
+    def angle_interval(self, theta):
+        """
+        :param theta: crash angle [deg]
+        :return: the post_process_dict interval (low, high] of theta, wrapping around 360, None if none matches
+        """
+        if self.angle_lut is not None and 0 < theta <= 360:
+            return self.angle_lut[math.ceil(theta) - 1]
+        return self.scan_interval(theta)
+
+    def to_grid(self, result):
+        """
+        :param result: set of cell names or a boolean array in the model output order
+        :return: [W, L, level] boolean grid
+        """
+        if isinstance(result, np.ndarray):
+            return result.astype(bool).reshape(self.shape)
+        grid = np.zeros(self.shape, dtype=bool)
+        grid.ravel()[[self.cell_index[cell] for cell in result]] = True
+        return grid
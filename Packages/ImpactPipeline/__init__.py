@@ -0,0 +1,5 @@
+from ImpactPipeline.impact_pipeline import ImpactPipeline
+from ImpactPipeline.service import ImpactService
+from ImpactPipeline.batch_runner import BatchRunner
+from ImpactPipeline.stage_graph import StageGraph
+from ImpactPipeline.output_encoder import ImpactDataEncoder
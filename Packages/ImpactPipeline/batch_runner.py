@@ -0,0 +1,112 @@
+import os
+import glob
+import json
+import time
+import traceback
+import multiprocessing
+
+import torch
+
+from ImpactPipeline.impact_pipeline import ImpactPipeline
+from ImpactPipeline.output_encoder import ImpactDataEncoder
+from Utils import LogLevel, DSLogger, EventFile
+
+_worker_pipeline = None  # one warmed pipeline per worker process
+_worker_encoder = None
+
+
+def init_worker(base_folder, torch_threads, triage, dtype="float32", output_mode="full", validity_gate=True):
+    global _worker_pipeline, _worker_encoder
+    # one intra-op thread per process and the stages run sequentially, the pool itself provides the parallelism
+    torch.set_num_threads(torch_threads)
+    _worker_pipeline = ImpactPipeline(base_folder, max_workers=1, triage=triage, dtype=dtype,
+                                      validity_gate=validity_gate)
+    _worker_pipeline.warm_up()
+    _worker_encoder = ImpactDataEncoder(output_mode)
+
+
+def process_task(task):
+    """
+    :param task: (event_id, kind, payload) - kind "file" with a json path, "line" with a json string or
+                 "binary" with an EventFile path
+    :return: (is_ok, output JSONL line)
+    """
+    event_id, kind, payload = task
+    start = time.perf_counter()
+    try:
+        if kind == "file":
+            with open(payload, 'r') as f:
+                event = json.load(f)
+        elif kind == "binary":
+            event = EventFile.load(payload)
+        else:
+            event = json.loads(payload)
+        impactData = _worker_pipeline.run(event)
+        record = {"EventId": event_id, "Status": "ok", "impactData": _worker_encoder.encode(impactData)}
+    except Exception as ex:
+        record = {"EventId": event_id, "Status": "error", "Error": str(ex), "Traceback": traceback.format_exc()}
+    record["ProcessingTime"] = time.perf_counter() - start
+    return record["Status"] == "ok", ImpactDataEncoder.to_json(record).decode('utf-8')
+
+
+class BatchRunner:
+    """
+    Runs the impact pipeline over a directory of event JSON files or a JSONL file (one event per line)
+    on a process pool and streams one result line per event to an output JSONL file.
+    A failing event produces an error line and does not stop the batch.
+    impactData is written in output_mode (ImpactDataEncoder), except sidecar - a JSONL line has no file of its own.
+    """
+    def __init__(self, base_folder=".", workers=None, torch_threads=1, start_method="spawn", triage=False,
+                 dtype="float32", output_mode="full", validity_gate=True):
+        if output_mode == "sidecar":
+            raise ValueError("BatchRunner: the sidecar output mode is not supported for JSONL output")
+        self.logger = DSLogger("BatchRunner_log")
+        self.base_folder = base_folder
+        self.workers = workers if workers is not None else os.cpu_count()
+        self.torch_threads = torch_threads
+        self.start_method = start_method
+        self.triage = triage
+        self.dtype = dtype
+        self.output_mode = output_mode
+        self.validity_gate = validity_gate
+
+    @staticmethod
+    def iter_tasks(source):
+        """
+        :param source: directory with *.json and / or *.evb (EventFile) events, or a .jsonl file
+        :return: generator of (event_id, kind, payload)
+        """
+        if os.path.isdir(source):
+            for path in sorted(glob.glob(os.path.join(source, '*.json')) +
+                               glob.glob(os.path.join(source, '*' + EventFile.EXTENSION))):
+                kind = "binary" if path.endswith(EventFile.EXTENSION) else "file"
+                yield os.path.splitext(os.path.basename(path))[0], kind, path
+        else:
+            name = os.path.basename(source)
+            with open(source, 'r') as f:
+                for i, line in enumerate(f):
+                    line = line.strip()
+                    if line:
+                        yield f"{name}:{i + 1}", "line", line
+
+    def run(self, source, output_path):
+        """
+        :param source: directory with *.json / *.evb events or a .jsonl file
+        :param output_path: output JSONL path, one {"EventId", "Status", "impactData" / "Error"} line per event
+        :return: {"Events": int, "Ok": int, "Errors": int, "ElapsedTime": float, "Workers": int}
+        """
+        self.logger.PrintLog(LogLevel.Info, f"BatchRunner: {source} -> {output_path} on {self.workers} workers")
+        summary = {"Events": 0, "Ok": 0, "Errors": 0, "Workers": self.workers}
+        start = time.perf_counter()
+        context = multiprocessing.get_context(self.start_method)
+        initargs = (self.base_folder, self.torch_threads, self.triage, self.dtype, self.output_mode,
+                    self.validity_gate)
+        with context.Pool(self.workers, initializer=init_worker, initargs=initargs) as pool, \
+                open(output_path, 'w') as fout:
+            for is_ok, line in pool.imap_unordered(process_task, self.iter_tasks(source)):
+                fout.write(line + "\n")
+                summary["Events"] += 1
+                summary["Ok" if is_ok else "Errors"] += 1
+        summary["ElapsedTime"] = time.perf_counter() - start
+        self.logger.PrintLog(LogLevel.Info, f"BatchRunner: {summary}")
+        return summary
@@ -0,0 +1,81 @@
+import os
+import glob
+import json
+
+import numpy as np
+
+from ImpactPipeline.impact_pipeline import ImpactPipeline
+from Utils import LogLevel, DSLogger
+
+
+def _is_number(value):
+    return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool)
+
+
+def flatten_output(obj, path=""):
+    """
+    :param obj: impactData
+    :return: {"key/key/...": leaf} - numbers, strings, bools and None, lists of strings as sorted tuples
+             (Damages cells come out of sets in no particular order)
+    """
+    leaves = dict()
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            leaves.update(flatten_output(value, f"{path}/{key}" if path else str(key)))
+    elif isinstance(obj, (list, tuple)) and obj and all(isinstance(v, str) for v in obj):
+        leaves[path] = tuple(sorted(obj))
+    elif isinstance(obj, (list, tuple)):
+        for i, value in enumerate(obj):
+            leaves.update(flatten_output(value, f"{path}/{i}"))
+    else:
+        leaves[path] = obj
+    return leaves
+
+
+def compare_outputs(reference, candidate, worst=10):
+    """
+    :param reference: impactData of the float64 pipeline
+    :param candidate: impactData of the pipeline under test
+    :return: {"Numeric": int, "MaxAbs": float, "MaxRel": float, "Worst": [{"Key", "Reference", "Candidate", "Rel"}],
+              "Mismatches": [{"Key", "Reference", "Candidate"}]} - mismatches are the non numeric leaves that differ
+              (crash decision, mechanism, damaged cells, injury levels, ...) and the keys only one side has
+    """
+    ref, cand = flatten_output(reference), flatten_output(candidate)
+    numeric = []
+    mismatches = []
+    for key in sorted(set(ref) | set(cand)):
+        a, b = ref.get(key), cand.get(key)
+        if _is_number(a) and _is_number(b):
+            diff = abs(float(a) - float(b))
+            numeric.append((diff / max(abs(float(a)), 1e-12), diff, key, a, b))
+        elif key not in ref or key not in cand or a != b:
+            mismatches.append({"Key": key, "Reference": a, "Candidate": b})
+    numeric.sort(reverse=True)
+    return {"Numeric": len(numeric),
+            "MaxAbs": max((d for _, d, _, _, _ in numeric), default=0.0),
+            "MaxRel": numeric[0][0] if numeric else 0.0,
+            "Worst": [{"Key": k, "Reference": a, "Candidate": b, "Rel": r} for r, _, k, a, b in numeric[:worst]],
+            "Mismatches": mismatches}
+
+
+def dtype_drift_report(base_folder=".", data_folder="Data", dtype="float32", reference_dtype="float64"):
+    """
+    runs every event of data_folder through the pipeline in dtype and in reference_dtype and compares the outputs
+    :return: {"Dtype", "ReferenceDtype", "Events": {event: compare_outputs}, "MaxRel": float,
+              "EventsWithMismatches": [event, ...]}
+    """
+    logger = DSLogger("ImpactPipeline_log")
+    report = {"Dtype": str(np.dtype(dtype)), "ReferenceDtype": str(np.dtype(reference_dtype)), "Events": dict()}
+    with ImpactPipeline(base_folder, max_workers=1, dtype=reference_dtype) as reference, \
+            ImpactPipeline(base_folder, max_workers=1, dtype=dtype) as candidate:
+        for path in sorted(glob.glob(os.path.join(data_folder, '*.json'))):
+            with open(path, 'r') as f:
+                event = json.load(f)
+            # through JSON so both sides compare as they would be saved
+            report["Events"][os.path.basename(path)] = compare_outputs(json.loads(json.dumps(reference.run(event))),
+                                                                       json.loads(json.dumps(candidate.run(event))))
+    report["MaxRel"] = max((e["MaxRel"] for e in report["Events"].values()), default=0.0)
+    report["EventsWithMismatches"] = [name for name, e in report["Events"].items() if e["Mismatches"]]
+    logger.PrintLog(LogLevel.Info, f"dtype drift {report['Dtype']} vs {report['ReferenceDtype']}: max relative "
+                                   f"{report['MaxRel']:.3g}, events with mismatches {report['EventsWithMismatches']}")
+    return report
@@ -0,0 +1,302 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+from CrashDetection import CrashDetection, InjuryLevel
+from VirtualSensors import VS, VSModelRegistry
+from MedicalCalculation import MedicalFormulationCalculation, FarSideMitigationCalculation
+from Damages import DamagesPrediction
+from IsValid import IsValid
+from SignalProcessing import PreparedEvent
+from AirBagDeploy import airbag_deploy
+from ImpactPipeline.stage_graph import StageGraph
+from Utils import LogLevel, DSLogger, EventFile
+
+
+class ImpactPipeline:
+    """
+    The run.py flow (crash detection -> virtual sensors -> airbag -> damages -> medical criteria) as a reusable object.
+    Models are process-wide resident, so after warm_up() a call to run() only does signal processing and inference.
+    The stages after crash detection that do not depend on each other run concurrently on a thread pool,
+    shut down by close() or at the end of a with block.
+    With validity_gate (the default) IsValid runs first, before any model: an invalid signal skips every stage.
+    In triage mode the heavy stages (virtual sensors, damages, medical) only run for valid crash events,
+    unless the full flow is requested for the event.
+    The signals are parsed, processed and fed to the models in dtype (float32 by default); the crash statistics
+    and the JSON output stay float64, rawData echoes the input samples as they were given.
+    """
+    def __init__(self, base_folder=".", calib_info=None, offset=None, max_workers=4, triage=False, dtype="float32",
+                 validity_gate=True):
+        self.logger = DSLogger("ImpactPipeline_log")
+        self.base_folder = base_folder
+        self.calib_info = calib_info if calib_info is not None else {
+            # creating unit matrix for aligned signal
+            "OperationalMat": np.eye(3),
+            "AxesOrientation": "FLU"}
+        self.offset = offset if offset is not None else [0, 0, 0]
+        self.max_workers = max_workers  # threads for the independent stages, 1 runs them sequentially
+        self.executor = None
+        self.triage = triage
+        self.dtype = np.dtype(dtype)
+        self.validity_gate = validity_gate
+
+    def warm_up(self):
+        """
+        loads every model used by the pipeline into memory
+        :return: {"VirtualSensors": registry stats, "CrashDetection": load status, "Damages": load status}
+        """
+        self.logger.PrintLog(LogLevel.Info, "ImpactPipeline: warming up models")
+        warm_info = {}
+        for name, load in [("CrashDetection", CrashDetection.get_resident_model),
+                           ("Damages", DamagesPrediction.get_resident_model)]:
+            try:
+                start = time.perf_counter()
+                load(self.base_folder)
+                warm_info[name] = {"loaded": True, "load_time_sec": time.perf_counter() - start}
+            except Exception as ex:
+                self.logger.PrintLog(LogLevel.Error, f"ImpactPipeline: failed to load {name} model: {ex}")
+                warm_info[name] = {"loaded": False, "error": str(ex)}
+        warm_info["VirtualSensors"] = VSModelRegistry.get(self.base_folder).stats()
+        return warm_info
+
+    @staticmethod
+    def event_to_df(event, dtype=np.float64):
+        """
+        :param event: event dict in the shape of Data/*.json, or an EventFile
+        :param dtype: dtype the signals are parsed to
+        :return: rawData_df with columns Acc_X, Acc_Y, Acc_Z, Gyro_X, Gyro_Y, Gyro_Z
+        """
+        if isinstance(event, EventFile):
+            # a view of the event file when it is stored in dtype
+            return event.to_df(dtype)
+        Acc_X = event['Acc_X']['Data']
+        Acc_Y = event['Acc_Y']['Data']
+        Acc_Z = event['Acc_Z']['Data']
+        gyr_x = event['Sensors'][0]['Data']
+        gyr_y = event['Sensors'][1]['Data']
+        gyr_z = event['Sensors'][2]['Data']
+        return pd.DataFrame(np.array([Acc_X, Acc_Y, Acc_Z, gyr_x, gyr_y, gyr_z], dtype=dtype).T,
+                            columns=["Acc_X", "Acc_Y", "Acc_Z", 'Gyro_X', 'Gyro_Y', 'Gyro_Z'])
+
+    @staticmethod
+    def CalcOccFarSideMitigation(occDict, knownOcc, unknownOcc, mechanism):
+        if occDict is None:
+            raise ValueError("occDict is not defined.")
+        if knownOcc is None:
+            raise ValueError("knownOcc is not defined.")
+        if unknownOcc is None:
+            raise ValueError("unknownOcc is not defined.")
+
+        try:
+            # get known medical criteria
+            if knownOcc in occDict.keys():
+                medCriteria = occDict[knownOcc].get('MedicalCriteria')
+                # calculate FarSideMitigation for unknown occupant
+                fsmc = FarSideMitigationCalculation(mechanism, int(unknownOcc), medCriteria)
+                farSideDict = fsmc.Run()
+                occDict[unknownOcc] = {'MedicalCriteria': farSideDict}
+            else:
+                raise Exception(f"Occupant {knownOcc} is missing medical criteria.")
+        except Exception as ex:
+            msg = ex.message if hasattr(ex, 'message') else str(ex.args)
+            raise Exception(f"Error while calculating far side mitigation: {msg}")
+
+    def crash_probabilities(self, events):
+        """
+        crash model prediction only, for many events in batched forward passes (backfills)
+        :param events: list of event dicts in the shape of Data/*.json
+        :return: (crash [bool array], crash_prob [float array]) in the order of events
+        """
+        crops = []
+        for event in events:
+            crashDetectionObj = CrashDetection(self.base_folder, self.event_to_df(event, self.dtype), self.calib_info,
+                                               self.offset)
+            signals, _ = crashDetectionObj.multi_input_signals()
+            crops.append(signals)
+        return CrashDetection.prediction_for_multi_input_batch(self.base_folder, crops)
+
+    def get_executor(self):
+        if self.max_workers <= 1:
+            return None
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ImpactStage")
+        return self.executor
+
+    def close(self):
+        """
+        shuts down the stage thread pool, a later run() starts a new one
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def build_graph(self, rawData_df, triage=False, event_type=None, validity=None):
+        """
+        :param rawData_df: rawData_df of the event
+        :param triage: gate the heavy stages on the crash result and on IsValid
+        :param event_type: event type passed to IsValid ("KA" events are always valid)
+        :param validity: (is_valid, error_message) of the validity gate, IsValid is not a stage then
+        :return: StageGraph - CrashDetection first, then VS, AirBagDeploy, Damages and InjuryLevel which only
+                 need the crash result, and Medical which needs the virtual sensors
+        """
+        calibInfo = self.calib_info
+        offset = self.offset
+        base_folder = self.base_folder
+        # rotation and filtering shared by CrashDetection, VS and Damages
+        preparedEvent = PreparedEvent(rawData_df, calibInfo, offset, dtype=self.dtype)
+
+        def crash_detection(results):
+            return CrashDetection(base_folder, rawData_df, calibInfo, offset, prepared_event=preparedEvent).run()
+
+        def virtual_sensors(results):
+            return VS(base_folder, rawData_df, calibInfo, results["CrashDetection"], offset,
+                      prepared_event=preparedEvent).run()
+
+        def airbag(results):
+            return airbag_deploy.AirBagDeploy(base_folder, rawData_df, calibInfo, results["CrashDetection"],
+                                              offset).run()
+
+        def damages(results):
+            return DamagesPrediction(base_folder, rawData_df, calibInfo, results["CrashDetection"], offset,
+                                     prepared_event=preparedEvent).run()
+
+        def injury_level(results):
+            return InjuryLevel(base_folder, rawData_df, calibInfo, results["CrashDetection"], offset).run()
+
+        def medical(results):
+            return self.medical_criteria(results["VirtualSensors"], results["CrashDetection"].get("mechanism"))
+
+        def is_valid(results):
+            return IsValid(base_folder, rawData_df, event_type).run()
+
+        def triage_gate(results):
+            isCrash, reason = results["CrashDetection"].get('isCrash')
+            if not isCrash:
+                return f"triage: no crash ({reason})"
+            valid, message = results["IsValid"] if validity is None else validity
+            if not valid:
+                return f"triage: signal not valid ({message})"
+            return None
+
+        graph = StageGraph()
+        graph.add("CrashDetection", crash_detection)
+        heavy_deps, heavy_condition = ["CrashDetection"], None
+        if triage and validity is None:
+            graph.add("IsValid", is_valid)
+            heavy_deps, heavy_condition = ["CrashDetection", "IsValid"], triage_gate
+        elif triage:
+            heavy_condition = triage_gate
+        graph.add("VirtualSensors", virtual_sensors, deps=heavy_deps, condition=heavy_condition)
+        graph.add("AirBagDeploy", airbag, deps=["CrashDetection"])
+        graph.add("Damages", damages, deps=heavy_deps, condition=heavy_condition)
+        graph.add("InjuryLevel", injury_level, deps=["CrashDetection"])
+        graph.add("Medical", medical, deps=["CrashDetection", "VirtualSensors"])
+        return graph
+
+    def medical_criteria(self, occpVsDict, mechanism):
+        """
+        :param occpVsDict: virtual sensors per occupant, output of VS.run
+        :param mechanism: crash mechanism
+        :return: {occupant location: {"VirtualSensors", "MedicalCriteria"}}
+        """
+        occpDict = {}
+        # run medical criteria for each known occupant
+        for occKey, occVS in occpVsDict.items():
+            occLocation = occKey.split('_')[1]  # get the location
+            occpDict[occLocation] = {}
+            occpDict[occLocation]['VirtualSensors'] = occVS
+            mfc = MedicalFormulationCalculation(mechanism, occVS)
+            occpDict[occLocation]['MedicalCriteria'] = mfc.Run()
+
+        # run FarSideMitigation only for Side crash
+        if mechanism == "SideLeft":
+            self.CalcOccFarSideMitigation(occpDict, "1", "2", mechanism)
+            self.CalcOccFarSideMitigation(occpDict, "4", "3", mechanism)
+        elif mechanism == "SideRight":
+            self.CalcOccFarSideMitigation(occpDict, "2", "1", mechanism)
+            self.CalcOccFarSideMitigation(occpDict, "3", "4", mechanism)
+
+        # run Post Process calculations for each occupant
+        for occVal in occpDict.values():
+            MedicalFormulationCalculation.run_post_processing_summary(occVal["MedicalCriteria"])
+        return occpDict
+
+    def run_with_report(self, event, full=False):
+        """
+        :param event: event dict in the shape of Data/*.json, or an EventFile
+        :param full: run every stage even in triage mode or with the validity gate
+        :return: (impactData, schedule report of the stages - see StageGraph.schedule_report)
+        """
+        start = time.perf_counter()
+        rawData_df = self.event_to_df(event, self.dtype)
+        validity = None
+        if self.validity_gate and not full:
+            validity = IsValid(self.base_folder, rawData_df, event.get("EventType")).run()
+        graph = self.build_graph(rawData_df, triage=self.triage and not full, event_type=event.get("EventType"),
+                                 validity=validity)
+        if validity is not None and not validity[0]:
+            # no model sees an invalid signal
+            skipped = {name: f"signal not valid ({validity[1]})" for name in graph.stages}
+            report = graph.schedule_report({}, time.perf_counter() - start, skipped)
+            self.logger.PrintLog(LogLevel.Info, f"ImpactPipeline: rejected by the validity gate: {validity[1]}")
+            return {'rawData': self.raw_data_output(event),
+                    'IsValid': {"Valid": False, "Reason": validity[1]}, 'SkippedStages': skipped}, report
+        results, report = graph.run(self.get_executor())
+        self.logger.PrintLog(LogLevel.Info, f"ImpactPipeline: wall time {report['WallTime']:.3f} sec, critical path "
+                                            f"{' -> '.join(report['CriticalPath'])} {report['CriticalPathTime']:.3f} sec")
+
+        crashDict = results["CrashDetection"]
+        isCrash, reason = crashDict.get('isCrash')
+        impactData = {}
+        impactData['rawData'] = self.raw_data_output(event)
+        impactData['IsCrash'] = isCrash
+        impactData['Dv'] = crashDict.get('DV')
+        impactData['MaxG'] = crashDict.get('maxG')
+        if isCrash:
+            impactData['Confidence'] = crashDict.get('confidence')
+            impactData['Theta'] = crashDict.get('theta')
+            impactData['Mechanism'] = crashDict.get("mechanism")
+        else:
+            impactData['Mechanism'] = "No Crash"
+        if "IsValid" in results or validity is not None:
+            valid, message = results["IsValid"] if validity is None else validity
+            impactData['IsValid'] = {"Valid": valid, "Reason": message}
+        impactData['AirBagDeploy'] = results["AirBagDeploy"]
+        if "Damages" in results:
+            impactData['Damages'] = results["Damages"].get('final')
+        if "Medical" in results:
+            impactData['Occupants'] = results["Medical"]
+        if report["Skipped"]:
+            impactData['SkippedStages'] = report["Skipped"]
+        return impactData, report
+
+    @staticmethod
+    def raw_data_output(event):
+        """
+        :param event: event dict in the shape of Data/*.json, or an EventFile
+        :return: {column: samples} of rawData_df as given, not rounded to the processing dtype - the lists of the
+                 event dict (not copies), or views of the EventFile columns in their stored dtype
+        """
+        if isinstance(event, EventFile):
+            return {column: event.signals[:, i] for i, column in enumerate(event.header["Columns"])}
+        return {"Acc_X": event['Acc_X']['Data'], "Acc_Y": event['Acc_Y']['Data'], "Acc_Z": event['Acc_Z']['Data'],
+                "Gyro_X": event['Sensors'][0]['Data'], "Gyro_Y": event['Sensors'][1]['Data'],
+                "Gyro_Z": event['Sensors'][2]['Data']}
+
+    def run(self, event, full=False):
+        """
+        :param event: event dict in the shape of Data/*.json, or an EventFile
+        :param full: run every stage even in triage mode or with the validity gate
+        :return: impactData dict, as saved by run.py; in triage mode skipped stages have no key and are listed
+                 with their reason under SkippedStages, an event rejected by the validity gate only has rawData,
+                 IsValid and SkippedStages
+        """
+        impactData, _ = self.run_with_report(event, full)
+        return impactData
@@ -0,0 +1,143 @@
+import os
+import json
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ImpactDataEncoder:
+    """
+    Writes impactData in one of the output modes:
+        full      - every value, float64 signals (as json.dump of impactData)
+        float32   - signals as float32 (shortest float32 text)
+        quantized - signals rounded to `decimals` decimals
+        summary   - no signals, rawData and the occupants' VirtualSensors are left out
+        sidecar   - signals in a binary <name>.bin next to the JSON, referenced by {"Sidecar", "Offset", "Length",
+                    "Dtype"} in place of the list
+    The signals are the columns of rawData and of every VirtualSensors dict.
+    Encoding uses orjson when it is installed (numpy scalars and arrays natively), json otherwise.
+    """
+    MODES = ("full", "float32", "quantized", "summary", "sidecar")
+    SIGNAL_KEYS = ("rawData", "VirtualSensors")
+    SIDECAR_EXTENSION = ".bin"
+
+    def __init__(self, mode="full", decimals=4, dtype="float32", indent=False):
+        """
+        :param mode: one of MODES
+        :param decimals: decimals kept by the quantized mode
+        :param dtype: signal dtype of the float32 and sidecar modes
+        :param indent: indented JSON (2 spaces with orjson)
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"unknown output mode {mode}, expected one of {self.MODES}")
+        self.mode = mode
+        self.decimals = decimals
+        self.dtype = np.dtype(dtype)
+        self.indent = indent
+
+    def _encode_signal(self, values, sidecar):
+        if self.mode == "float32":
+            return np.asarray(values, dtype=self.dtype)
+        if self.mode == "quantized":
+            return np.round(np.asarray(values, dtype=np.float64), self.decimals)
+        if self.mode == "sidecar":
+            data = np.asarray(values, dtype=self.dtype)
+            chunks, name = sidecar
+            offset = sum(chunk.nbytes for chunk in chunks)
+            chunks.append(data)
+            return {"Sidecar": name, "Offset": offset, "Length": len(data), "Dtype": data.dtype.str}
+        return values
+
+    def encode(self, impactData, sidecar=None):
+        """
+        :param impactData: output of ImpactPipeline.run
+        :param sidecar: ([arrays], sidecar file name) collecting the signals of the sidecar mode
+        :return: impactData with the signals encoded for the mode, the input is not modified
+        """
+        if isinstance(impactData, dict):
+            encoded = dict()
+            for key, value in impactData.items():
+                if key in self.SIGNAL_KEYS and isinstance(value, dict):
+                    if self.mode != "summary":
+                        encoded[key] = {k: self._encode_signal(v, sidecar) for k, v in value.items()}
+                else:
+                    encoded[key] = self.encode(value, sidecar)
+            return encoded
+        if isinstance(impactData, (list, tuple)):
+            return [self.encode(value, sidecar) for value in impactData]
+        return impactData
+
+    def dumps(self, impactData, sidecar=None):
+        """
+        :return: JSON bytes of the encoded impactData
+        """
+        return self.to_json(self.encode(impactData, sidecar), self.indent)
+
+    def save(self, impactData, path):
+        """
+        :param path: JSON path, the sidecar mode also writes path without extension + SIDECAR_EXTENSION
+        :return: list of the written paths
+        """
+        sidecar_path = os.path.splitext(path)[0] + self.SIDECAR_EXTENSION
+        sidecar = ([], os.path.basename(sidecar_path)) if self.mode == "sidecar" else None
+        body = self.dumps(impactData, sidecar)
+        with open(path, 'wb') as f:
+            f.write(body)
+        if sidecar is None:
+            return [path]
+        with open(sidecar_path, 'wb') as f:
+            for chunk in sidecar[0]:
+                f.write(chunk.tobytes())
+        return [path, sidecar_path]
+
+    @classmethod
+    def load(cls, path):
+        """
+        :param path: JSON written by save, in any mode
+        :return: impactData, sidecar references resolved to lists
+        """
+        with open(path, 'rb') as f:
+            impactData = json.loads(f.read())
+        folder = os.path.dirname(path)
+        sidecars = dict()
+
+        def resolve(obj):
+            if isinstance(obj, dict):
+                if "Sidecar" in obj and "Offset" in obj:
+                    if obj["Sidecar"] not in sidecars:
+                        sidecars[obj["Sidecar"]] = np.fromfile(os.path.join(folder, obj["Sidecar"]), dtype=np.uint8)
+                    data = sidecars[obj["Sidecar"]]
+                    size = np.dtype(obj["Dtype"]).itemsize * obj["Length"]
+                    return data[obj["Offset"]:obj["Offset"] + size].view(obj["Dtype"]).tolist()
+                return {k: resolve(v) for k, v in obj.items()}
+            if isinstance(obj, list):
+                return [resolve(v) for v in obj]
+            return obj
+        return resolve(impactData)
+
+    @staticmethod
+    def _default(obj):
+        # json fallback for what orjson serializes natively
+        if isinstance(obj, np.ndarray):
+            if obj.dtype == np.float32:
+                # shortest float32 text, as orjson writes it
+                return [float(str(v)) for v in obj.ravel()]
+            return obj.tolist()
+        if isinstance(obj, np.generic):
+            return obj.item()
+        raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+    @classmethod
+    def to_json(cls, obj, indent=False):
+        """
+        :param obj: JSON-like object, numpy scalars and arrays allowed
+        :return: JSON bytes
+        """
+        if orjson is not None:
+            option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+            return orjson.dumps(obj, default=cls._default, option=option)
+        return json.dumps(obj, default=cls._default, indent=2 if indent else None).encode('utf-8')
@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import traceback
+import socketserver
+from urllib.parse import urlsplit, parse_qs
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from ImpactPipeline.impact_pipeline import ImpactPipeline
+from ImpactPipeline.output_encoder import ImpactDataEncoder
+from SignalProcessing import SignalProcessing as sp
+from IsValid import IsValid
+from Utils import LogLevel, DSLogger
+
+
+class ImpactRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /impact  body: event JSON (shape of Data/*.json)  ->  impactData JSON
+                  /impact?full=1 runs every stage, past the triage and the validity gate
+                  /impact?output=summary|float32|quantized encodes the signals as ImpactDataEncoder (default full)
+    GET  /health                                           ->  warm-up info of the resident models, FIR design cache,
+                                                               validity gate latency and rejection counters
+    """
+
+    def send_json(self, status, obj, headers=None):
+        body = ImpactDataEncoder.to_json(obj)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json(200, {"status": "ok", "models": self.server.warm_info, "fir_cache": sp.fir_cache_info(),
+                                 "is_valid": IsValid.stats()})
+        else:
+            self.send_json(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != "/impact":
+            self.send_json(404, {"error": f"unknown path {self.path}"})
+            return
+        query = parse_qs(url.query)
+        full = query.get("full", ["0"])[0].lower() in ("1", "true")
+        output_mode = query.get("output", ["full"])[0]
+        if output_mode not in ImpactDataEncoder.MODES or output_mode == "sidecar":
+            self.send_json(400, {"error": f"unsupported output mode {output_mode}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            event = json.loads(self.rfile.read(length))
+        except ValueError as ex:
+            self.send_json(400, {"error": f"invalid event json: {ex}"})
+            return
+
+        start = time.perf_counter()
+        try:
+            impactData = self.server.pipeline.run(event, full=full)
+        except Exception as ex:
+            self.server.logger.PrintLog(LogLevel.Exception, str(traceback.format_exc()))
+            self.send_json(500, {"error": str(ex)})
+            return
+        run_time = time.perf_counter() - start
+        self.server.logger.PrintLog(LogLevel.Info, f"ImpactService: event processed in {run_time:.3f} sec")
+        self.send_json(200, ImpactDataEncoder(output_mode).encode(impactData), {"X-Processing-Time": f"{run_time:.6f}"})
+
+    def address_string(self):
+        # unix socket clients have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format, *args):
+        self.server.logger.PrintLog(LogLevel.Debug, "ImpactService: " + format % args)
+
+
+class UnixHTTPServer(socketserver.UnixStreamServer):
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("unix", 0)
+
+
+class ImpactService:
+    """
+    Long-lived local service that keeps the impact pipeline warm between events.
+    Listens on HTTP (host, port) or, when unix_socket is given, on that Unix socket path.
+    """
+    def __init__(self, base_folder=".", host="127.0.0.1", port=8080, unix_socket=None, triage=False,
+                 dtype="float32", validity_gate=True):
+        self.logger = DSLogger("ImpactService_log")
+        self.pipeline = ImpactPipeline(base_folder, triage=triage, dtype=dtype, validity_gate=validity_gate)
+        self.host = host
+        self.port = port
+        self.unix_socket = unix_socket
+        self.server = None
+
+    def start(self):
+        start = time.perf_counter()
+        warm_info = self.pipeline.warm_up()
+        self.logger.PrintLog(LogLevel.Info, f"ImpactService: warm up took {time.perf_counter() - start:.3f} sec")
+
+        if self.unix_socket is not None:
+            if os.path.exists(self.unix_socket):
+                os.remove(self.unix_socket)
+            self.server = UnixHTTPServer(self.unix_socket, ImpactRequestHandler)
+            address = self.unix_socket
+        else:
+            self.server = HTTPServer((self.host, self.port), ImpactRequestHandler)
+            address = f"http://{self.host}:{self.server.server_port}"
+        self.server.pipeline = self.pipeline
+        self.server.warm_info = warm_info
+        self.server.logger = self.logger
+        self.logger.PrintLog(LogLevel.Info, f"ImpactService: listening on {address}")
+        return self.server
+
+    def serve_forever(self):
+        if self.server is None:
+            self.start()
+        try:
+            self.server.serve_forever()
+        finally:
+            self.stop()
+
+    def stop(self):
+        if self.server is not None:
+            self.server.server_close()
+            self.server = None
+        self.pipeline.close()
+        if self.unix_socket is not None and os.path.exists(self.unix_socket):
+            os.remove(self.unix_socket)
@@ -0,0 +1,122 @@
+import time
+from concurrent.futures import wait, FIRST_COMPLETED
+
+
+class StageGraph:
+    """
+    Dependency graph of pipeline stages.
+    A stage is a callable that gets the dict of finished stage results and returns its own result;
+    it is started as soon as all the stages it depends on are done, so independent stages overlap on the executor.
+    A stage with a condition is skipped when the condition returns a reason, and so are the stages depending on it.
+    """
+    def __init__(self):
+        self.stages = dict()  # name -> (func, [dependency names]), in insertion order
+        self.conditions = dict()  # name -> condition(results) returning None to run or a skip reason
+
+    def add(self, name, func, deps=(), condition=None):
+        if name in self.stages:
+            raise ValueError(f"stage {name} is already defined")
+        for dep in deps:
+            if dep not in self.stages:
+                raise ValueError(f"stage {name} depends on unknown stage {dep}")
+        self.stages[name] = (func, list(deps))
+        if condition is not None:
+            self.conditions[name] = condition
+        return self
+
+    def skip_reason(self, name, results, skipped):
+        """
+        :return: None if the stage should run, otherwise why it is skipped
+        """
+        for dep in self.stages[name][1]:
+            if dep in skipped:
+                return f"{dep} was skipped"
+        condition = self.conditions.get(name)
+        return condition(results) if condition is not None else None
+
+    def run(self, executor=None):
+        """
+        :param executor: concurrent.futures executor, stages run sequentially in insertion order when None
+        :return: (results, report) - results: {stage: result} of the stages that ran, report: see schedule_report
+        """
+        results = dict()
+        skipped = dict()
+        timings = dict()
+        start = time.perf_counter()
+
+        def timed(name, func):
+            stage_start = time.perf_counter()
+            result = func(results)
+            timings[name] = (stage_start - start, time.perf_counter() - start)
+            return result
+
+        if executor is None:
+            for name, (func, _) in self.stages.items():
+                reason = self.skip_reason(name, results, skipped)
+                if reason is None:
+                    results[name] = timed(name, func)
+                else:
+                    skipped[name] = reason
+        else:
+            pending = dict(self.stages)
+            running = dict()  # future -> name
+            while pending or running:
+                ready = [n for n, (_, deps) in pending.items() if all(d in results or d in skipped for d in deps)]
+                while ready:
+                    name = ready.pop(0)
+                    func, _ = pending.pop(name)
+                    reason = self.skip_reason(name, results, skipped)
+                    if reason is None:
+                        running[executor.submit(timed, name, func)] = name
+                    else:
+                        skipped[name] = reason
+                        # the stages waiting only on this one are ready now
+                        ready = [n for n, (_, deps) in pending.items()
+                                 if all(d in results or d in skipped for d in deps)]
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception:
+                        # let the stages already started finish before raising, nothing new is scheduled
+                        wait(running)
+                        raise
+        return results, self.schedule_report(timings, time.perf_counter() - start, skipped)
+
+    def critical_path(self, durations):
+        """
+        :param durations: {stage: duration in sec} of the stages that ran
+        :return: (longest dependency chain of stages by total duration, its duration)
+        """
+        finish = dict()
+        previous = dict()
+        for name, (_, deps) in self.stages.items():  # insertion order is a topological order
+            if name not in durations:
+                continue
+            prev = max([d for d in deps if d in finish], key=lambda d: finish[d], default=None)
+            previous[name] = prev
+            finish[name] = durations[name] + (finish[prev] if prev is not None else 0.0)
+        if not finish:
+            return [], 0.0
+        name = max(finish, key=finish.get)
+        path_time = finish[name]
+        path = []
+        while name is not None:
+            path.append(name)
+            name = previous[name]
+        return path[::-1], path_time
+
+    def schedule_report(self, timings, wall_time, skipped=None):
+        """
+        :param timings: {stage: (start, end)} relative to the graph start
+        :param skipped: {stage: skip reason}
+        :return: {"Stages": {stage: {"Start", "End", "Duration"}}, "Skipped": {stage: reason},
+                  "CriticalPath": [stage, ...], "CriticalPathTime": float, "WallTime": float}
+        """
+        stages = {name: {"Start": s, "End": e, "Duration": e - s} for name, (s, e) in timings.items()}
+        path, path_time = self.critical_path({name: v["Duration"] for name, v in stages.items()})
+        return {"Stages": stages, "Skipped": dict(skipped or {}), "CriticalPath": path, "CriticalPathTime": path_time,
+                "WallTime": wall_time}
@@ -1,74 +1,241 @@
 import os
+import time
+import threading
 import numpy as np
 import pandas as pd
 
 from Utils import IO, DSLogger, LogLevel
 
 class IsValid:
+    """
+    Validity checks of the event signal, a cheap gate run before any model.
+    The checks work on [N, T, C] arrays in one NumPy pass for all the axes (N events of the same length) and are
+    declared in CHECKS with a cost estimate: they run by increasing cost and an event rejected by a check is not
+    passed to the following ones. Per-check latency and rejection counters are kept per process, see stats().
+    """
+    PEAK_NEAR_EDGE = "peak is too near the edge"
+    NOT_ENOUGH_UNIQUE = "not enough unique values"
+    CONSTANT_INTERVAL = 'During the event there is an interval at constant value'
+    BAD_RANGE = "the signal contains a value above the maximum valid value"
+    GYRO_ZEROS = "Gyro should not have long intervals of 0"
+    # name: classmethod (array, config) -> [N] failed, signal: acc_columns / gyro_columns of the config,
+    # cost: estimated time per event [us]
+    CHECKS = (
+        {"name": "bad_range", "signal": "acc", "cost": 10, "message": BAD_RANGE},
+        {"name": "peak_near_edge", "signal": "acc", "cost": 15, "message": PEAK_NEAR_EDGE},
+        {"name": "unique_values", "signal": "acc", "cost": 25, "message": NOT_ENOUGH_UNIQUE},
+        {"name": "gyro_zeros", "signal": "gyro", "cost": 60, "message": GYRO_ZEROS},
+        {"name": "constant_segment", "signal": "acc", "cost": 70, "message": CONSTANT_INTERVAL},
+    )
+    __Configs = dict()  # static, config path -> IsValid config
+    __Stats = dict()  # static, check name -> {"Calls", "Rejections", "TotalTime"}, "Gate" -> {"Events", "Rejected"}
+    __Lock = threading.Lock()
+
     def __init__(self, basefolder, signal, event_type):
         self.basefolder = basefolder
-        self.config = IO.read_config(self.basefolder, 'IsValid')
-        self.signal_acc = signal.loc[:, self.config["acc_columns"]]
-        self.signal_gyro = signal.loc[:, self.config["gyro_columns"]]
+        self.config = self.get_config(self.basefolder)
+        self.signal_acc, self.signal_gyro = self.signal_arrays(signal, self.config)
         self.event_type = event_type
         self.logger = DSLogger("IsValid")
 
-    def check_1_peak_near_edge(self, df):
-        """detects if a crash pulse has its peak too close to the edge"""
-        if df.to_numpy().max() > self.config["minimal_edge_peak_height"]:
-            ind = np.argmax(np.linalg.norm(df, axis=1))
-            # check if the peak is too near the beginning or too near the end
-            if ind < self.config["minimal_peak_edge_distance"] or (df.shape[0] - ind) < self.config["minimal_peak_edge_distance"]:
-                return "peak is too near the edge"
-            else:
-                return False
-        else:
-            return False
+    @classmethod
+    def get_config(cls, basefolder):
+        """
+        :return: config/IsValid_config.json of basefolder, read once per process
+        """
+        key = os.path.abspath(os.path.join(basefolder, 'config', 'IsValid_config.json'))
+        with cls.__Lock:
+            if key not in cls.__Configs:
+                cls.__Configs[key] = IO.read_config(basefolder, 'IsValid')
+            return cls.__Configs[key]
 
-    def check_2_constant_values(self, df):
-        for name, col_values in df.iteritems():
+    @staticmethod
+    def signal_arrays(signal, config):
+        """
+        :param signal: rawData_df
+        :return: ([T, 3] acc_columns, [T, 3] gyro_columns) arrays of the config
+        """
+        data = signal.to_numpy()
+        arrays = []
+        for columns in (config["acc_columns"], config["gyro_columns"]):
+            indexer = signal.columns.get_indexer(columns)
+            if (indexer < 0).any():
+                raise KeyError(f"IsValid: missing signal columns {list(np.array(columns)[indexer < 0])}")
+            arrays.append(data[:, indexer])
+        return arrays
 
-            if col_values.unique().shape[0] < self.config["minimal_unique_values"]:
-                return "not enough unique values"
+    @classmethod
+    def checks(cls):
+        """
+        :return: CHECKS in running order, by increasing cost
+        """
+        return sorted(cls.CHECKS, key=lambda check: check["cost"])
 
-            for i in range(0, len(col_values) - self.config["max_constant_segment_length"]):
-                if col_values.iloc[i:i + self.config["max_constant_segment_length"]].unique().shape[0] == 1:
-                    return 'During the event there is an interval at constant value'
+    @staticmethod
+    def longest_run(mask):
+        """
+        :param mask: [..., T, C] boolean
+        :return: [..., C] length of the longest run of True along T
+        """
+        count = np.cumsum(mask, axis=-2)
+        # the count at the last False, carried forward, is subtracted so the count restarts after every False
+        reset = np.maximum.accumulate(np.where(mask, 0, count), axis=-2)
+        return (count - reset).max(axis=-2, initial=0)
 
-        return False
+    @staticmethod
+    def unique_counts(data):
+        """
+        :param data: [..., T, C]
+        :return: [..., C] number of unique values of every axis, NaN counted once as pandas unique()
+        """
+        ordered = np.sort(data, axis=-2)
+        nan = np.isnan(ordered)
+        distinct = (ordered[..., 1:, :] != ordered[..., :-1, :]) & ~(nan[..., 1:, :] & nan[..., :-1, :])
+        return (ordered.shape[-2] > 0) + distinct.sum(axis=-2)
 
-    def check_3_bad_range(self, df):
-        if df.abs().to_numpy().max() > self.config["max_valid_value"]:
-            return "the signal contains a value above the maximum valid value"
-        else:
-            return False
-        
-    def check_gyro(self, df):
-        start_ind = np.nonzero(self.signal_gyro.to_numpy())[0][0]
-        gyro_df = self.signal_gyro.to_numpy()[start_ind:]
-        for i in range(3):
-            zeros_ind = np.where(gyro_df[:,i] == 0)[0]
-            split_ind = np.where(np.diff(zeros_ind) > 1)[0]
-            splits = np.split(zeros_ind, split_ind+1)
-            res = max([len(j) for j in splits])
-            if res > self.config["gyro_max_num_zeros"]:
-                return "Gyro should not have long intervals of 0"
-        return False
+    @classmethod
+    def peak_near_edge(cls, acc, config):
+        """
+        detects if a crash pulse has its peak too close to the edge
+        :param acc: [N, T, C] acceleration
+        :return: [N] boolean
+        """
+        ind = np.argmax(np.linalg.norm(acc, axis=-1), axis=-1)
+        distance = config["minimal_peak_edge_distance"]
+        return (acc.max(axis=(-2, -1)) > config["minimal_edge_peak_height"]) & \
+            ((ind < distance) | (acc.shape[-2] - ind < distance))
+
+    @classmethod
+    def unique_values(cls, acc, config):
+        """
+        :param acc: [N, T, C] acceleration
+        :return: [N] boolean, an axis with less than minimal_unique_values values
+        """
+        return (cls.unique_counts(acc) < config["minimal_unique_values"]).any(axis=-1)
+
+    @classmethod
+    def constant_segment(cls, acc, config):
+        """
+        run-length of diff == 0 on all the axes at once
+        :param acc: [N, T, C] acceleration
+        :return: [N] boolean, an axis constant over max_constant_segment_length samples
+        """
+        length = config["max_constant_segment_length"]
+        # the segments start at 0 .. T - length - 1, the last sample is never part of one
+        head = acc[..., :-1, :]
+        equal = (head[..., 1:, :] == head[..., :-1, :]) | (np.isnan(head[..., 1:, :]) & np.isnan(head[..., :-1, :]))
+        return ((cls.longest_run(equal) >= length - 1) & (acc.shape[-2] > length)).any(axis=-1)
+
+    @classmethod
+    def bad_range(cls, acc, config):
+        """
+        a value above max_valid_value before the crash onset (the first sample with a norm above
+        crash_onset_value), or at the onset itself: a crash pulse ramps through the valid range and may then
+        saturate above it, a spike straight out of rest does not
+        :param acc: [N, T, C] acceleration
+        :return: [N] boolean
+        """
+        out_of_range = np.abs(acc).max(axis=-1) > config["max_valid_value"]
+        crash = np.linalg.norm(acc, axis=-1) > config["crash_onset_value"]
+        # the samples after the onset, the onset itself is checked
+        after_onset = np.zeros_like(crash)
+        after_onset[..., 1:] = np.logical_or.accumulate(crash, axis=-1)[..., :-1]
+        return (out_of_range & ~after_onset).any(axis=-1)
+
+    @classmethod
+    def gyro_zeros(cls, gyro, config):
+        """
+        long intervals of 0 after the first non zero gyro sample, an all zero gyro fails too
+        :param gyro: [N, T, C] gyro
+        :return: [N] boolean
+        """
+        started = np.logical_or.accumulate((gyro != 0).any(axis=-1), axis=-1)
+        zeros = (gyro == 0) & started[..., None]
+        return (cls.longest_run(zeros) > config["gyro_max_num_zeros"]).any(axis=-1) | ~started[..., -1]
+
+    @classmethod
+    def validate(cls, acc, gyro, config):
+        """
+        the registered checks on a batch, by increasing cost; a rejected event skips the following checks
+        :param acc: [N, T, C] acceleration
+        :param gyro: [N, T, C] gyro
+        :return: [N] error message of the rejecting check, None for the valid events
+        """
+        signals = {"acc": acc, "gyro": gyro}
+        messages = np.full(len(acc), None, dtype=object)
+        pending = np.arange(len(acc))
+        timings = []
+        for check in cls.checks():
+            if len(pending) == 0:
+                break
+            data = signals[check["signal"]]
+            start = time.perf_counter()
+            failed = getattr(cls, check["name"])(data if len(pending) == len(data) else data[pending], config)
+            timings.append((check["name"], len(pending), int(failed.sum()), time.perf_counter() - start))
+            messages[pending[failed]] = check["message"]
+            pending = pending[~failed]
+        with cls.__Lock:
+            for name, calls, rejections, duration in timings:
+                stats = cls.__Stats.setdefault(name, {"Calls": 0, "Rejections": 0, "TotalTime": 0.0})
+                stats["Calls"] += calls
+                stats["Rejections"] += rejections
+                stats["TotalTime"] += duration
+            gate = cls.__Stats.setdefault("Gate", {"Events": 0, "Rejected": 0})
+            gate["Events"] += len(acc)
+            gate["Rejected"] += len(acc) - len(pending)
+        return messages
+
+    @classmethod
+    def stats(cls):
+        """
+        :return: {"Gate": {"Events", "Rejected"}, "Checks": {name: {"Cost", "Calls", "Rejections", "TotalTime",
+                  "MeanTime"}}} since the process start (or reset_stats), MeanTime per checked event [sec]
+        """
+        with cls.__Lock:
+            gate = dict(cls.__Stats.get("Gate", {"Events": 0, "Rejected": 0}))
+            checks = dict()
+            for check in cls.checks():
+                stats = dict(cls.__Stats.get(check["name"], {"Calls": 0, "Rejections": 0, "TotalTime": 0.0}))
+                stats["Cost"] = check["cost"]
+                stats["MeanTime"] = stats["TotalTime"] / stats["Calls"] if stats["Calls"] else None
+                checks[check["name"]] = stats
+        return {"Gate": gate, "Checks": checks}
+
+    @classmethod
+    def reset_stats(cls):
+        with cls.__Lock:
+            cls.__Stats.clear()
+
+    @classmethod
+    def run_batch(cls, basefolder, signals, event_types=None):
+        """
+        :param signals: list of rawData_df
+        :param event_types: list of event types ("KA" events are always valid), default None for all
+        :return: list of (is_valid, error_message) as run(), in the order of signals
+        """
+        config = cls.get_config(basefolder)
+        event_types = event_types if event_types is not None else [None] * len(signals)
+        results = [(True, None)] * len(signals)
+        by_length = dict()
+        for i, (signal, event_type) in enumerate(zip(signals, event_types)):
+            if event_type != "KA":
+                by_length.setdefault(len(signal), []).append(i)
+        logger = DSLogger("IsValid")
+        for indices in by_length.values():
+            arrays = [cls.signal_arrays(signals[i], config) for i in indices]
+            acc = np.stack([a for a, _ in arrays])
+            gyro = np.stack([g for _, g in arrays])
+            for i, message in zip(indices, cls.validate(acc, gyro, config)):
+                if message is not None:
+                    logger.PrintLog(LogLevel.Warning, "signal not valid: {}".format(message))
+                    results[i] = (False, message)
+        return results
 
     def run(self):
         if self.event_type=="KA":
             return True, None
 
-        method_list = [func for func in dir(IsValid) if callable(getattr(IsValid, func)) and
-                       func.startswith("check")]
-        method_list = sorted(method_list)
-
-        error_message = None
-        for method in method_list:
-            ans = eval(str('self.' + method + '(self.signal_acc)'))
-            if ans:
-                error_message = ans
-                break
+        error_message = self.validate(self.signal_acc[None], self.signal_gyro[None], self.config)[0]
 
         if error_message is None:
             return True, None
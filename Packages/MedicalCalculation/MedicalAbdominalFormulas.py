@@ -6,12 +6,12 @@ import MedicalCalculation.MedicalBasicFormulas as mbf
 
 # -------------------------------------------- Abdominal -------------------------------------------------#
 # ---------- Abdomen_peak_total_force_side_v1 - side [non-sensitive] [force]=[N] ---------# #[abbreviation: FmaxSideV1]
-def abdomen_peak_total_force_side_v1(vs_df, fs):  # not yet trained
+def abdomen_peak_total_force_side_v1(vs_df, fs, peaks=None):  # not yet trained
     for sensor in ["ABDOFR_FOY", "ABDOMI_FOY", "ABDORE_FOY"]:
         if not sensor in vs_df.keys():
             return None
 
-    max_force_side = sum([mbf.calc_3ms(vs_df[sensor].to_numpy().astype('float'), fs) for sensor in ["ABDOFR_FOY", "ABDOMI_FOY", "ABDORE_FOY"]])
+    max_force_side = sum([mbf.sensor_3ms(vs_df, sensor, fs, peaks) for sensor in ["ABDOFR_FOY", "ABDOMI_FOY", "ABDORE_FOY"]])
 
     p3ais = round(100 / (1 + math.exp(6.04044 - 0.002133 * max_force_side)))
     p4ais = round(100 / (1 + math.exp(9.282 - 0.002133 * max_force_side)))
@@ -30,12 +30,12 @@ def abdomen_peak_total_force_side_v1(vs_df, fs):  # not yet trained
     return FormulaResult(value=max_force_side, ais3p=p3ais, ais4p=p4ais, limit=limit)
 
 # ---------- Abdomen_peak_total_force_side_v2 [non-sensitive] [force]=[N] -----------#     #[abbreviation: FmaxSideV2]
-def abdomen_peak_total_force_side_v2(vs_df, fs):   # not yet trained
+def abdomen_peak_total_force_side_v2(vs_df, fs, peaks=None):   # not yet trained
     for sensor in ["ABDOFR_FOY", "ABDOMI_FOY", "ABDORE_FOY"]:
         if not sensor in vs_df.keys():
             return None
 
-    max_force_side = sum([mbf.calc_3ms(vs_df[sensor].to_numpy().astype('float'), fs) for sensor in ["ABDOFR_FOY", "ABDOMI_FOY", "ABDORE_FOY"]])
+    max_force_side = sum([mbf.sensor_3ms(vs_df, sensor, fs, peaks) for sensor in ["ABDOFR_FOY", "ABDOMI_FOY", "ABDORE_FOY"]])
 
     if 1000 <= max_force_side <= 1200:
         limit = 1
@@ -51,12 +51,12 @@ def abdomen_peak_total_force_side_v2(vs_df, fs):   # not yet trained
     return FormulaResult(value=max_force_side, limit=limit)
 
 # ---------- Abdomen_peak_total_force_side [sensitive]  [force]=[N] -----------#   #[abbreviation: FmaxSideSens]
-def abdomen_peak_total_force_side_sensitive(vs_df, fs):    # not yet trained
+def abdomen_peak_total_force_side_sensitive(vs_df, fs, peaks=None):    # not yet trained
     for sensor in ["ABDOFR_FOY", "ABDOMI_FOY", "ABDORE_FOY"]:
         if not sensor in vs_df.keys():
             return None
 
-    max_force_side = sum([mbf.calc_3ms(vs_df[sensor].to_numpy().astype('float'), fs) for sensor in ["ABDOFR_FOY", "ABDOMI_FOY", "ABDORE_FOY"]])
+    max_force_side = sum([mbf.sensor_3ms(vs_df, sensor, fs, peaks) for sensor in ["ABDOFR_FOY", "ABDOMI_FOY", "ABDORE_FOY"]])
 
     if 1000 <= max_force_side <= 1200:
         limit = 1
@@ -72,14 +72,14 @@ def abdomen_peak_total_force_side_sensitive(vs_df, fs):    # not yet trained
     return FormulaResult(value=max_force_side, limit=limit)
 
 # ---------- Abdomen_peak_force_maximum_compression - Side =[kN] -----------#
-def  abdomen_peak_force_maximum_compression_side(vs_df, fs, abdominal_depth =200): #[abbreviation: FmaxCmax]
+def  abdomen_peak_force_maximum_compression_side(vs_df, fs, abdominal_depth =200, peaks=None): #[abbreviation: FmaxCmax]
     for sensor in ["ABDOFR_FOY", "ABDOMI_FOY", "ABDORE_FOY", "RIBSL_DSY"]:
         if not sensor in vs_df.keys():
             return None
 
-    Dmax_side = mbf.calc_3ms(vs_df["RIBSL_DSY"].to_numpy().astype('float'), fs)
+    Dmax_side = mbf.sensor_3ms(vs_df, "RIBSL_DSY", fs, peaks)
     Compression = (Dmax_side / abdominal_depth) * 100
-    max_force_side = sum([mbf.calc_3ms(vs_df[sensor].to_numpy().astype('float'), fs) for sensor in ["ABDOFR_FOY", "ABDOMI_FOY", "ABDORE_FOY"]])
+    max_force_side = sum([mbf.sensor_3ms(vs_df, sensor, fs, peaks) for sensor in ["ABDOFR_FOY", "ABDOMI_FOY", "ABDORE_FOY"]])
 
     max_force_max_compression = (max_force_side / 1000) * Compression
 
@@ -216,12 +216,12 @@ def viscous_criteria_abdomen_frontal(vs_df, fs, b=200):   # not yet trained
 
 '''
 # ---------- Abdomen_peak_total_force_frontal_v1 [non-sensitive] [force]=[N] -----------#
-def abdomen_peak_total_force_frontal_v1(vs_df, fs): #[abbreviation: FmaxFrontalV1]
+def abdomen_peak_total_force_frontal_v1(vs_df, fs, peaks=None): #[abbreviation: FmaxFrontalV1]
     for sensor in ["Abdo_Fx"]:
         if not sensor in vs_df.keys():
             return None
 
-    max_force = mbf.calc_3ms(vs_df["Abdo_Fx"].to_numpy().astype('float'), fs)
+    max_force = mbf.sensor_3ms(vs_df, "Abdo_Fx", fs, peaks)
 
     if 980 <= max_force <= 1500:
         limit = 1
@@ -237,12 +237,12 @@ def abdomen_peak_total_force_frontal_v1(vs_df, fs): #[abbreviation: FmaxFrontalV
     return FormulaResult(value=max_force, limit=limit)
 
 # ---------- Abdomen_peak_total_force_frontal_v2 [non-sensitive] [force]=[N] -----------#
-def abdomen_peak_total_force_frontal_v2(vs_df, fs): #[abbreviation: FmaxFrontalV2]
+def abdomen_peak_total_force_frontal_v2(vs_df, fs, peaks=None): #[abbreviation: FmaxFrontalV2]
     for sensor in ["Abdo_Fx"]:
         if not sensor in vs_df.keys():
             return None
 
-    max_force = mbf.calc_3ms(vs_df["Abdo_Fx"].to_numpy().astype('float'), fs)
+    max_force = mbf.sensor_3ms(vs_df, "Abdo_Fx", fs, peaks)
 
     if 1200 <= max_force <= 2800:
         limit = 1
@@ -258,12 +258,12 @@ def abdomen_peak_total_force_frontal_v2(vs_df, fs): #[abbreviation: FmaxFrontalV
     return FormulaResult(value=max_force, limit=limit)
 
 # ---------- Abdomen_peak_total_force_frontal [sensitive] [force]=[N] -----------#
-def abdomen_peak_total_force_frontal_sensitive(vs_df, fs): #[abbreviation: FmaxFrontalSens]
+def abdomen_peak_total_force_frontal_sensitive(vs_df, fs, peaks=None): #[abbreviation: FmaxFrontalSens]
     for sensor in ["Abdo_Fx"]:
         if not sensor in vs_df.keys():
             return None
 
-    max_force = mbf.calc_3ms(vs_df["Abdo_Fx"].to_numpy().astype('float'), fs)
+    max_force = mbf.sensor_3ms(vs_df, "Abdo_Fx", fs, peaks)
 
     if 880 <= max_force <= 1200:
         limit = 1
@@ -280,12 +280,12 @@ def abdomen_peak_total_force_frontal_sensitive(vs_df, fs): #[abbreviation: FmaxF
 
 
 # ---------- Abdomen_max_compression - side, [def]=[mm] -----------#
-def abdomen_max_compression_side(vs_df, fs, abdominal_depth = 200): #[abbreviation: CmaxSide]
+def abdomen_max_compression_side(vs_df, fs, abdominal_depth = 200, peaks=None): #[abbreviation: CmaxSide]
     for sensor in ["Abdo_DSY"]:
         if not sensor in vs_df.keys():
             return None
 
-    max_compression = mbf.calc_3ms(vs_df["Abdo_DSY"].to_numpy().astype('float'), fs)
+    max_compression = mbf.sensor_3ms(vs_df, "Abdo_DSY", fs, peaks)
     max_c_percent= max_compression / abdominal_depth * 100
 
     if 10 <= max_c_percent <= 25:
@@ -302,12 +302,12 @@ def abdomen_max_compression_side(vs_df, fs, abdominal_depth = 200): #[abbreviati
     return FormulaResult(value=max_compression, limit=limit)
 
 # ----------[Non-sensitive] Abdomen_max_compression - frontal, [def]=[mm] -----------#
-def abdomen_max_compression_frontal(vs_df, fs, abdominal_depth = 200): #[abbreviation: CmaxFrontal]
+def abdomen_max_compression_frontal(vs_df, fs, abdominal_depth = 200, peaks=None): #[abbreviation: CmaxFrontal]
     for sensor in ["Abdo_DSX"]:
         if not sensor in vs_df.keys():
             return None
 
-    max_compression = mbf.calc_3ms(vs_df["Abdo_DSX"].to_numpy().astype('float'), fs)
+    max_compression = mbf.sensor_3ms(vs_df, "Abdo_DSX", fs, peaks)
     max_c_percent= max_compression / abdominal_depth * 100
 
     p4ais = round(100 / (1 + math.exp(10.046 - 0.01853 * max_c_percent)))
@@ -326,12 +326,12 @@ def abdomen_max_compression_frontal(vs_df, fs, abdominal_depth = 200): #[abbrevi
     return FormulaResult(value=max_compression, ais4p=p4ais, limit=limit)
 
 # ---------- Sensitive_abdomen_max_compression - frontal, [def]=[mm] -----------#
-def abdomen_max_compression_frontal_sensitive(vs_df, fs, abdominal_depth = 200): #[abbreviation: CmaxFrontalSens]
+def abdomen_max_compression_frontal_sensitive(vs_df, fs, abdominal_depth = 200, peaks=None): #[abbreviation: CmaxFrontalSens]
     for sensor in ["Abdo_DSX"]:
         if not sensor in vs_df.keys():
             return None
 
-    max_compression = mbf.calc_3ms(vs_df["Abdo_DSX"].to_numpy().astype('float'), fs) # TODO: Change sensor name
+    max_compression = mbf.sensor_3ms(vs_df, "Abdo_DSX", fs, peaks) # TODO: Change sensor name
     max_c_percent= max_compression / abdominal_depth * 100
 
     p4ais = round(100 / (1 + math.exp(16.29 - 0.35 * max_c_percent)))
@@ -1,18 +1,46 @@
 import numpy as np
+import bottleneck as bn
 
 
 # -------------------------------------- Max Acceleration in 3ms ---------------------------------------#
 
 def calc_3ms(data, fs):
-    data = np.asarray(data)
-    a3ms = 0
+    # data - (T,) or a batch (N, T)
+    # returns the max over the 3ms windows of min(abs(window)), per row for a batch
+    data = np.abs(np.asarray(data, dtype=float))
     win_size = int(round(0.003 * fs))
-    for i in range(len(data) - win_size):
-        a = min(abs(data[i:i + win_size]))
-        if a > a3ms:
-            a3ms = a
+    n_windows = data.shape[-1] - win_size
+    if n_windows <= 0:
+        return 0 if data.ndim == 1 else np.zeros(data.shape[0])
+
+    # move_min puts the min of the window ending at i in i, keep the windows starting at 0 .. n_windows - 1
+    window_min = bn.move_min(data, window=win_size, axis=-1)[..., win_size - 1:win_size - 1 + n_windows]
+    a3ms = np.asarray(bn.nanmax(window_min, axis=-1))
+    if data.ndim == 1:
+        return a3ms[()] if a3ms > 0 else 0
+    return np.where(a3ms > 0, a3ms, 0)
+
+
+def sensor_peaks(vs_df, fs):
+    """
+    calc_3ms of all the numeric VS channels of vs_df in one batch
+    :return: {sensor: 3ms peak}
+    """
+    numeric = vs_df.select_dtypes('number')
+    batch = calc_3ms(numeric.to_numpy(dtype=float).T, fs)
+    return {col: (peak if peak > 0 else 0) for col, peak in zip(numeric.columns, batch)}
+
+
+def sensor_3ms(vs_df, sensor, fs, peaks=None):
+    """
+    calc_3ms of a VS channel
+    :param peaks: sensor_peaks of vs_df, the channel is computed directly when it is not there (or peaks is None)
+    """
+    if peaks is not None and sensor in peaks:
+        return peaks[sensor]
+    # missing or non numeric channel, same error as the direct computation
+    return calc_3ms(vs_df[sensor].to_numpy().astype('float'), fs)
 
-    return a3ms
 
 # -------------------------------------------- Max force  -----------------------------------------------#
 
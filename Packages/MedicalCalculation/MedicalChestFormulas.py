@@ -8,7 +8,7 @@ import MedicalCalculation.MedicalBasicFormulas as mbf
 # ----------------------------------------------- Chest ---------------------------------------------------#
 
 # ---------- Compression Criteria_frontal ----------#              # abbreviation [Deflection/C/CC/CCFrontal/Compression criteria]
-def compression_criterion_frontal(vs_df, fs, chst_depth=229):
+def compression_criterion_frontal(vs_df, fs, chst_depth=229, peaks=None):
     # vs_df - data frame with all virtual sensors
     # fs = [Hz]
     # chst_depth - the depth of the chest in mm
@@ -17,7 +17,7 @@ def compression_criterion_frontal(vs_df, fs, chst_depth=229):
         if not sensor in vs_df.keys():
             return None
 
-    Dmax_frontal = mbf.calc_3ms(vs_df["CHST_DSX"].to_numpy().astype('float'), fs)
+    Dmax_frontal = mbf.sensor_3ms(vs_df, "CHST_DSX", fs, peaks)
     Compression = (Dmax_frontal / chst_depth) * 100
 
     """AIS_chest = -3.78 + 19.56 * C
@@ -39,7 +39,7 @@ def compression_criterion_frontal(vs_df, fs, chst_depth=229):
     return FormulaResult(value=Compression, limit=limit)
 
 # ---------- Compression Criteria_side ----------#          # abbreviation [Deflection/C/CC/CCSide/Compression criteria]
-def compression_criterion_side(vs_df, fs, chst_depth_side=114):
+def compression_criterion_side(vs_df, fs, chst_depth_side=114, peaks=None):
     # vs_df - data frame with all virtual sensors
     # fs = [Hz]
     # chst_depth - the depth of the chest in mm
@@ -48,7 +48,7 @@ def compression_criterion_side(vs_df, fs, chst_depth_side=114):
         if not sensor in vs_df.keys():
             return None
 
-    Dmax_side = mbf.calc_3ms(vs_df["RIBSL_DSY"].to_numpy().astype('float'), fs)
+    Dmax_side = mbf.sensor_3ms(vs_df, "RIBSL_DSY", fs, peaks)
     Compression = (Dmax_side / chst_depth_side) * 100
 
     p4ais = round((1 / (1 + math.exp(31.22 - 0.79 * Compression)))*100)
@@ -65,12 +65,12 @@ def compression_criterion_side(vs_df, fs, chst_depth_side=114):
     return FormulaResult(value=Compression, ais4p=p4ais, limit=limit)
 
 # --------- maximal chest deflection - Front [mm] -----------#          # abbreviation [Dmax_frontal/MCDF/DeqMax]
-def maximal_chest_deflection_frontal(vs_df, fs, age = 45):
+def maximal_chest_deflection_frontal(vs_df, fs, age = 45, peaks=None):
     for sensor in ["CHST_DSX"]:
         if not sensor in vs_df.keys():
             return None
 
-    Dmax_frontal = mbf.calc_3ms(vs_df["CHST_DSX"].to_numpy().astype('float'), fs)
+    Dmax_frontal = mbf.sensor_3ms(vs_df, "CHST_DSX", fs, peaks)
 
     p2ais = round(100 / (1 + math.exp(1.8706 - 0.04439 * Dmax_frontal)))
     p3ais = round(100 / (1 + math.exp(12.597 - 0.05861 * age - 1.568 * Dmax_frontal ** 0.4612)))
@@ -93,12 +93,12 @@ def maximal_chest_deflection_frontal(vs_df, fs, age = 45):
 
 '''
 # --------- sensitive_maximal chest deflection - Front [mm] -#          # abbreviation [Dmax_frontal/MCDFSens/DeqMax]
-def maximal_chest_deflection_frontal_sensitive(vs_df, fs, age = 45):
+def maximal_chest_deflection_frontal_sensitive(vs_df, fs, age = 45, peaks=None):
     for sensor in ["CHST_DSX"]:
         if not sensor in vs_df.keys():
             return None
 
-    Dmax_frontal = mbf.calc_3ms(vs_df["CHST_DSX"].to_numpy().astype('float'), fs)
+    Dmax_frontal = mbf.sensor_3ms(vs_df, "CHST_DSX", fs, peaks)
     p3ais = round(100 / (1 + math.exp(17.5 - age / 5.8 - Dmax_frontal / 3.3)))
 
     return FormulaResult(value=Dmax_frontal, ais3p=p3ais)
@@ -106,12 +106,12 @@ def maximal_chest_deflection_frontal_sensitive(vs_df, fs, age = 45):
 '''
 
 ## --------- maximal chest deflection - Side [mm] -----------#           # abbreviation [Dmax_frontal/MCDS/DeqMax]
-def maximal_chest_deflection_side(vs_df, fs):
+def maximal_chest_deflection_side(vs_df, fs, peaks=None):
     for sensor in ["RIBSL_DSY"]:
         if not sensor in vs_df.keys():
             return None
 
-    Dmax_side = mbf.calc_3ms(vs_df["RIBSL_DSY"].to_numpy().astype('float'), fs)
+    Dmax_side = mbf.sensor_3ms(vs_df, "RIBSL_DSY", fs, peaks)
 
     p3ais = round(100 / (1 + math.exp(5.3895 - 0.0919 * Dmax_side)))
 
@@ -190,7 +190,7 @@ def chest_viscous_criteria_side(vs_df, fs, b=140):
 
 
 # ----------- Combined Thoracic Index (CTI) - Front -----------#        # abbreviation [CTI]
-def combined_thoracic_index(vs_df, fs, a_int=85, d_int=102):
+def combined_thoracic_index(vs_df, fs, a_int=85, d_int=102, peaks=None):
     for sensor in ["CHST_DSX", "CHST_ACX", "CHST_ACY", "CHST_ACZ"]:
         if not sensor in vs_df.keys():
             return None
@@ -198,7 +198,7 @@ def combined_thoracic_index(vs_df, fs, a_int=85, d_int=102):
     acc = [math.sqrt(a ** 2 + b ** 2 + c ** 2) for a, b, c in
            zip(vs_df['CHST_ACX'].tolist(), vs_df['CHST_ACY'].tolist(), vs_df['CHST_ACZ'].tolist())]
     a_max = mbf.calc_3ms(np.array(acc).astype('float'), fs)
-    d_max = mbf.calc_3ms(vs_df["CHST_DSX"].to_numpy().astype('float'), fs)
+    d_max = mbf.sensor_3ms(vs_df, "CHST_DSX", fs, peaks)
 
     cti = a_max / a_int + d_max / d_int
     p2ais = round(100 / (1 + math.exp(4.847 - 6.036 * cti)))
@@ -221,14 +221,14 @@ def combined_thoracic_index(vs_df, fs, a_int=85, d_int=102):
     return FormulaResult(value=float(cti), ais2p=p2ais, ais3p=p3ais, ais4p=p4ais, ais5p=p5ais, limit=limit)
 
 # ---------- Thoracic Trauma Index (TTI) - Side ------------#           # abbreviation [TTI]
-def thoracic_trauma_index(vs_df, fs, m=77.7, age=45):
+def thoracic_trauma_index(vs_df, fs, m=77.7, age=45, peaks=None):
     for sensor in ["RIBSL_ACY", "LUSP_ACY"]:
         if not sensor in vs_df.keys():
             return None
 
     m_std = 75
-    riby = mbf.calc_3ms(vs_df["RIBSL_ACY"].to_numpy().astype('float'), fs)
-    t12y = mbf.calc_3ms(vs_df["LUSP_ACY"].to_numpy().astype('float'), fs)
+    riby = mbf.sensor_3ms(vs_df, "RIBSL_ACY", fs, peaks)
+    t12y = mbf.sensor_3ms(vs_df, "LUSP_ACY", fs, peaks)
     tti = 1.4 * age + 0.5 * (riby + t12y) * m / m_std
 
     p2ais = p3ais = round(100 / (1 + math.exp(7.2448 - 0.048657 * tti)))
@@ -273,7 +273,7 @@ def belt_force(vs_df, fs, age=45, k=98, m_type="human"):
     return FormulaResult(value=float(F))
 
 # ----------- TIP (number of rib fracture to semi-thorax) - Side -----# # abbreviation [TIPSide]
-def tip_side(vs_df, fs, bcf=-1.2, semi_thx_wd=138):
+def tip_side(vs_df, fs, bcf=-1.2, semi_thx_wd=138, peaks=None):
     # fs = [Hz]
     # bcf =
     # semi_thx_wd = [mm]
@@ -282,7 +282,7 @@ def tip_side(vs_df, fs, bcf=-1.2, semi_thx_wd=138):
         if not sensor in vs_df.keys():
             return None
 
-    ribs3ms = mbf.calc_3ms(vs_df["RIBSL_DSY"].to_numpy().astype('float'), fs)
+    ribs3ms = mbf.sensor_3ms(vs_df, "RIBSL_DSY", fs, peaks)
     tip = int(0.22275 * ((ribs3ms / semi_thx_wd) * 100) + 2.4824 * bcf - 1.098)
 
     #relative_chst_compress = float((ribs3ms / semi_thx_wd) * 100)
@@ -304,7 +304,7 @@ def tip_side(vs_df, fs, bcf=-1.2, semi_thx_wd=138):
     return FormulaResult(value=float(tip), limit=limit)
 
 # ----------- TIP (number of rib fracture to Full-thorax) - frontal --# # abbreviation [TIPFrontal]
-def tip_frontal(vs_df, fs, bcf=-1.2, full_thx_wd=229):
+def tip_frontal(vs_df, fs, bcf=-1.2, full_thx_wd=229, peaks=None):
     # fs = [Hz]
     # bcf =
     # thx_wd = [mm]
@@ -313,7 +313,7 @@ def tip_frontal(vs_df, fs, bcf=-1.2, full_thx_wd=229):
         if not sensor in vs_df.keys():
             return None
 
-    chest3ms = mbf.calc_3ms(vs_df["CHST_DSX"].to_numpy().astype('float'), fs)
+    chest3ms = mbf.sensor_3ms(vs_df, "CHST_DSX", fs, peaks)
     tip = int(0.22275 * ((chest3ms / full_thx_wd) * 100) + 2.4824 * bcf - 1.098)
 
     if tip < 0:
@@ -350,12 +350,12 @@ def chest_a3ms_frontal(vs_df, fs):
 
 
 # ---------- Chest A3ms - side ----------#                             # abbreviation [CA3msSide]
-def chest_a3ms_side(vs_df, fs):
+def chest_a3ms_side(vs_df, fs, peaks=None):
     for sensor in ["RIBSL_ACY"]:
         if not sensor in vs_df.keys():
             return None
 
-    chest_A3ms_side = mbf.calc_3ms(np.array(vs_df["RIBSL_ACY"]).astype('float'), fs)
+    chest_A3ms_side = mbf.sensor_3ms(vs_df, "RIBSL_ACY", fs, peaks)
 
     if 60 <= chest_A3ms_side:
         limit = 1
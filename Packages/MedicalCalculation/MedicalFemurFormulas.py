@@ -6,13 +6,13 @@ import MedicalCalculation.MedicalBasicFormulas as mbf
 # ------------------------------------------------- Femur -------------------------------------------------#
 
 # ----------- sensitive_femur axial force - Front, Rear, [axial_force] = [KN] ----------##[abbreviation: PAFFrontalSens]
-def femur_axial_force_sensitive(vs_df, fs):         # not yet trained
+def femur_axial_force_sensitive(vs_df, fs, peaks=None):         # not yet trained
     for sensor in ["FEMRLE_FOZ", 'FEMRRI_FOZ']:
         if not sensor in vs_df.keys():
             return None
 
-    axial_forceL = mbf.calc_3ms(vs_df['FEMRLE_FOZ'].to_numpy().astype('float'), fs) / 1000
-    axial_forceR = mbf.calc_3ms(vs_df['FEMRRI_FOZ'].to_numpy().astype('float'), fs) / 1000
+    axial_forceL = mbf.sensor_3ms(vs_df, "FEMRLE_FOZ", fs, peaks) / 1000
+    axial_forceR = mbf.sensor_3ms(vs_df, "FEMRRI_FOZ", fs, peaks) / 1000
     axial_force = max(axial_forceL, axial_forceR)
 
     p2ais = round(100 / (1 + math.exp(5.7949 - 0.3126 * axial_force)))
@@ -30,13 +30,13 @@ def femur_axial_force_sensitive(vs_df, fs):         # not yet trained
     return FormulaResult(value=axial_force, ais2p=p2ais, ais3p=p3ais, limit=limit)
 
 # ----------- femur_axial_force - Front, Rear, [axial_force] = [KN] -----------#          #[abbreviation: PAFFrontal]
-def femur_axial_force(vs_df, fs):  # Non-sensitive version  # not yet trained
+def femur_axial_force(vs_df, fs, peaks=None):  # Non-sensitive version  # not yet trained
     for sensor in ["FEMRLE_FOZ", 'FEMRRI_FOZ']:
         if not sensor in vs_df.keys():
             return None
 
-    axial_forceL = mbf.calc_3ms(vs_df['FEMRLE_FOZ'].to_numpy().astype('float'), fs) / 1000
-    axial_forceR = mbf.calc_3ms(vs_df['FEMRRI_FOZ'].to_numpy().astype('float'), fs) / 1000
+    axial_forceL = mbf.sensor_3ms(vs_df, "FEMRLE_FOZ", fs, peaks) / 1000
+    axial_forceR = mbf.sensor_3ms(vs_df, "FEMRRI_FOZ", fs, peaks) / 1000
     axial_force = max(axial_forceL, axial_forceR)
 
     p2ais = round(100 / (1 + math.exp(5.7949 - 0.5196 * axial_force)))
@@ -54,13 +54,13 @@ def femur_axial_force(vs_df, fs):  # Non-sensitive version  # not yet trained
 
 '''
 # ----------- sensitive_femur_bending_moment - side, [lateral_bending_moment] = [Nm] -----------#
-def sensitive_femur_bending_moment(vs_df, fs): #sensitive version #[abbreviation: Bending_moment]
+def sensitive_femur_bending_moment(vs_df, fs, peaks=None): #sensitive version #[abbreviation: Bending_moment]
     for sensor in ["FEMRLE_MOY", 'FEMRRI_MOY']:
         if not sensor in vs_df.keys():
             return None
 
-    bending_momentL = mbf.calc_3ms(vs_df['FEMRLE_MOY'].to_numpy().astype('float'), fs) / 1000
-    bending_momentR = mbf.calc_3ms(vs_df['FEMRLE_MOY'].to_numpy().astype('float'), fs) / 1000
+    bending_momentL = mbf.sensor_3ms(vs_df, "FEMRLE_MOY", fs, peaks) / 1000
+    bending_momentR = mbf.sensor_3ms(vs_df, "FEMRLE_MOY", fs, peaks) / 1000
     bending_moment = max(bending_momentL, bending_momentR)
 
     if 182 < bending_moment <= 220:
@@ -75,13 +75,13 @@ def sensitive_femur_bending_moment(vs_df, fs): #sensitive version #[abbreviation
     return FormulaResult(value=bending_moment, limit=limit)
 
 # ----------- femur_bending_moment - side, [lateral_bending_moment] = [Nm] -----------#
-def femur_bending_moment(vs_df, fs): #Non-sensitive version #[abbreviation: Bending_moment]
+def femur_bending_moment(vs_df, fs, peaks=None): #Non-sensitive version #[abbreviation: Bending_moment]
     for sensor in ["FEMRLE_MOY", 'FEMRRI_MOY']:
         if not sensor in vs_df.keys():
             return None
 
-    bending_momentL = mbf.calc_3ms(vs_df['FEMRLE_MOY'].to_numpy().astype('float'), fs) / 1000
-    bending_momentR = mbf.calc_3ms(vs_df['FEMRLE_MOY'].to_numpy().astype('float'), fs) / 1000
+    bending_momentL = mbf.sensor_3ms(vs_df, "FEMRLE_MOY", fs, peaks) / 1000
+    bending_momentR = mbf.sensor_3ms(vs_df, "FEMRLE_MOY", fs, peaks) / 1000
     bending_moment = max(bending_momentL, bending_momentR)
 
     if 254 < bending_moment <= 356:
@@ -96,13 +96,13 @@ def femur_bending_moment(vs_df, fs): #Non-sensitive version #[abbreviation: Bend
     return FormulaResult(value=bending_moment, limit=limit)
 
 # ----------- femur_lateral_compression_force - side, [lateral_force] = [kN] -----------#
-def femur_lateral_compression_force(vs_df, fs): #Non-sensitive version #[abbreviation: lateral_compression]
+def femur_lateral_compression_force(vs_df, fs, peaks=None): #Non-sensitive version #[abbreviation: lateral_compression]
     for sensor in ["FEMRLE_FY", 'FEMRRI_FY']: # TODO: Change sensor name
         if not sensor in vs_df.keys():
             return None
 
-    compression_forceL = mbf.calc_3ms(vs_df['FEMRLE_FY'].to_numpy().astype('float'), fs) / 1000 # TODO: Change sensor name
-    compression_forceR = mbf.calc_3ms(vs_df['FEMRLE_FY'].to_numpy().astype('float'), fs) / 1000 # TODO: Change sensor name
+    compression_forceL = mbf.sensor_3ms(vs_df, "FEMRLE_FY", fs, peaks) / 1000 # TODO: Change sensor name
+    compression_forceR = mbf.sensor_3ms(vs_df, "FEMRLE_FY", fs, peaks) / 1000 # TODO: Change sensor name
     compression_force = max(compression_forceL, compression_forceR)
 
     if 2.6 <= compression_force <= 6.2:
@@ -118,13 +118,13 @@ def femur_lateral_compression_force(vs_df, fs): #Non-sensitive version #[abbrevi
 
 
 # ----------- sensitive_femur_lateral_compression_force - side, [lateral_force] = [kN] -----------#
-def sensitive_femur_lateral_compression_force(vs_df, fs):  # Non-sensitive version #[abbreviation: lateral_compression]
+def sensitive_femur_lateral_compression_force(vs_df, fs, peaks=None):  # Non-sensitive version #[abbreviation: lateral_compression]
     for sensor in ["FEMRLE_FY", 'FEMRRI_FY']:  # TODO: Change sensor name
         if not sensor in vs_df.keys():
             return None
 
-    compression_forceL = mbf.calc_3ms(vs_df['FEMRLE_FY'].to_numpy().astype('float'), fs) / 1000  # TODO: Change sensor name
-    compression_forceR = mbf.calc_3ms(vs_df['FEMRLE_FY'].to_numpy().astype('float'), fs) / 1000  # TODO: Change sensor name
+    compression_forceL = mbf.sensor_3ms(vs_df, "FEMRLE_FY", fs, peaks) / 1000  # TODO: Change sensor name
+    compression_forceR = mbf.sensor_3ms(vs_df, "FEMRLE_FY", fs, peaks) / 1000  # TODO: Change sensor name
     compression_force = max(compression_forceL, compression_forceR)
 
     if 2.6 < compression_force <= 3.4:
@@ -1,4 +1,5 @@
 import pandas as pd
+import MedicalCalculation.MedicalBasicFormulas as mbf
 from MedicalCalculation.Common import CalcMaxAISWithLimit, CombineFormulas, CalcMaxAISByLimitWithFlag
 import MedicalCalculation.MedicalHeadFormulas as mhf
 import MedicalCalculation.MedicalNeckFormulas as mnf
@@ -13,6 +14,8 @@ class MedicalFormulationCalculation:
         self.fs = fs
         self.mechanism = mech
         self.vs_df = pd.DataFrame.from_dict(vs)
+        # 3ms peaks of every VS channel, computed once and shared by all the formulas
+        self.peaks_3ms = mbf.sensor_peaks(self.vs_df, self.fs)
         self.medical_criteria = {
             "Head": {
                 "HIC": {},
@@ -78,52 +81,52 @@ class MedicalFormulationCalculation:
         self.medical_criteria["Head"]["HA3ms"] = mhf.head_a3ms(self.vs_df, self.fs)
 
     def calc_neck(self):
-        self.medical_criteria["Neck"]["NIJFront"] = mnf.neck_injury_criteria_frontal(self.vs_df, self.fs)
-        self.medical_criteria["Neck"]["NIJSide"] = mnf.neck_injury_criteria_lateral(self.vs_df, self.fs)
+        self.medical_criteria["Neck"]["NIJFront"] = mnf.neck_injury_criteria_frontal(self.vs_df, self.fs, peaks=self.peaks_3ms)
+        self.medical_criteria["Neck"]["NIJSide"] = mnf.neck_injury_criteria_lateral(self.vs_df, self.fs, peaks=self.peaks_3ms)
         self.medical_criteria["Neck"]["NKMWhip"] = mnf.nkm(self.vs_df, self.fs, self.mechanism)
-        self.medical_criteria["Neck"]["MANIC"] = mnf.manic(self.vs_df, self.fs, self.mechanism)
+        self.medical_criteria["Neck"]["MANIC"] = mnf.manic(self.vs_df, self.fs, self.mechanism, peaks=self.peaks_3ms)
         self.medical_criteria["Neck"]["NICWhip"] = mnf.nic(self.vs_df, self.fs)
         self.medical_criteria["Neck"]["NShearF"] = mnf.neck_shear_force(self.vs_df, self.fs)
-        self.medical_criteria["Neck"]["NTensionF"] = mnf.neck_tension_force(self.vs_df, self.fs)
-        self.medical_criteria["Neck"]["NCompressionF"] = mnf.neck_compression_force(self.vs_df, self.fs)
-        self.medical_criteria["Neck"]["NExtensionF"] = mnf.neck_extension_force(self.vs_df, self.fs)
-        self.medical_criteria["Neck"]["NFlexionF"] = mnf.neck_flexion_force(self.vs_df, self.fs)
-        self.medical_criteria["Neck"]["LNIJRear"] = mnf.neck_injury_criteria_rear(self.vs_df, self.fs)
+        self.medical_criteria["Neck"]["NTensionF"] = mnf.neck_tension_force(self.vs_df, self.fs, peaks=self.peaks_3ms)
+        self.medical_criteria["Neck"]["NCompressionF"] = mnf.neck_compression_force(self.vs_df, self.fs, peaks=self.peaks_3ms)
+        self.medical_criteria["Neck"]["NExtensionF"] = mnf.neck_extension_force(self.vs_df, self.fs, peaks=self.peaks_3ms)
+        self.medical_criteria["Neck"]["NFlexionF"] = mnf.neck_flexion_force(self.vs_df, self.fs, peaks=self.peaks_3ms)
+        self.medical_criteria["Neck"]["LNIJRear"] = mnf.neck_injury_criteria_rear(self.vs_df, self.fs, peaks=self.peaks_3ms)
 
     def calc_chest(self):
-        self.medical_criteria["Chest"]["CCFrontal"] = mcf.compression_criterion_frontal(self.vs_df, self.fs)
-        self.medical_criteria["Chest"]["CCSide"] = mcf.compression_criterion_side(self.vs_df, self.fs)
-        self.medical_criteria["Chest"]["MCDF"] = mcf.maximal_chest_deflection_frontal(self.vs_df, self.fs)
-        self.medical_criteria["Chest"]["MCDS"] = mcf.maximal_chest_deflection_side(self.vs_df, self.fs)
+        self.medical_criteria["Chest"]["CCFrontal"] = mcf.compression_criterion_frontal(self.vs_df, self.fs, peaks=self.peaks_3ms)
+        self.medical_criteria["Chest"]["CCSide"] = mcf.compression_criterion_side(self.vs_df, self.fs, peaks=self.peaks_3ms)
+        self.medical_criteria["Chest"]["MCDF"] = mcf.maximal_chest_deflection_frontal(self.vs_df, self.fs, peaks=self.peaks_3ms)
+        self.medical_criteria["Chest"]["MCDS"] = mcf.maximal_chest_deflection_side(self.vs_df, self.fs, peaks=self.peaks_3ms)
         self.medical_criteria["Chest"]["VCMaxFront"] = mcf.chest_viscous_criteria_frontal(self.vs_df, self.fs)
         self.medical_criteria["Chest"]["VCMaxSide"] = mcf.chest_viscous_criteria_side(self.vs_df, self.fs)
-        self.medical_criteria["Chest"]["CTI"] = mcf.combined_thoracic_index(self.vs_df, self.fs)
-        self.medical_criteria["Chest"]["TTI"] = mcf.thoracic_trauma_index(self.vs_df, self.fs)
+        self.medical_criteria["Chest"]["CTI"] = mcf.combined_thoracic_index(self.vs_df, self.fs, peaks=self.peaks_3ms)
+        self.medical_criteria["Chest"]["TTI"] = mcf.thoracic_trauma_index(self.vs_df, self.fs, peaks=self.peaks_3ms)
         self.medical_criteria["Chest"]["BeltForce"] = mcf.belt_force(self.vs_df, self.fs)
-        self.medical_criteria["Chest"]["TIPSide"] = mcf.tip_side(self.vs_df, self.fs)
-        self.medical_criteria["Chest"]["TIPFrontal"] = mcf.tip_frontal(self.vs_df, self.fs)
+        self.medical_criteria["Chest"]["TIPSide"] = mcf.tip_side(self.vs_df, self.fs, peaks=self.peaks_3ms)
+        self.medical_criteria["Chest"]["TIPFrontal"] = mcf.tip_frontal(self.vs_df, self.fs, peaks=self.peaks_3ms)
         self.medical_criteria["Chest"]["CA3msFrontal"] = mcf.chest_a3ms_frontal(self.vs_df, self.fs)
-        self.medical_criteria["Chest"]["CA3msSide"] = mcf.chest_a3ms_side(self.vs_df, self.fs)
+        self.medical_criteria["Chest"]["CA3msSide"] = mcf.chest_a3ms_side(self.vs_df, self.fs, peaks=self.peaks_3ms)
 
     def calc_abdominal(self):
-        self.medical_criteria["Abdominal"]["FmaxSideV1"] = maf.abdomen_peak_total_force_side_v1(self.vs_df, self.fs)
-        self.medical_criteria["Abdominal"]["FmaxSideV2"] = maf.abdomen_peak_total_force_side_v2(self.vs_df, self.fs)
-        self.medical_criteria["Abdominal"]["FmaxSideSens"] = maf.abdomen_peak_total_force_side_sensitive(self.vs_df, self.fs)
-        self.medical_criteria["Abdominal"]["FmaxCmaxSide"] = maf.abdomen_peak_force_maximum_compression_side(self.vs_df, self.fs)
+        self.medical_criteria["Abdominal"]["FmaxSideV1"] = maf.abdomen_peak_total_force_side_v1(self.vs_df, self.fs, peaks=self.peaks_3ms)
+        self.medical_criteria["Abdominal"]["FmaxSideV2"] = maf.abdomen_peak_total_force_side_v2(self.vs_df, self.fs, peaks=self.peaks_3ms)
+        self.medical_criteria["Abdominal"]["FmaxSideSens"] = maf.abdomen_peak_total_force_side_sensitive(self.vs_df, self.fs, peaks=self.peaks_3ms)
+        self.medical_criteria["Abdominal"]["FmaxCmaxSide"] = maf.abdomen_peak_force_maximum_compression_side(self.vs_df, self.fs, peaks=self.peaks_3ms)
         self.medical_criteria["Abdominal"]["VCAbdomenSideSens"] = maf.viscous_criteria_abdomen_side_sensitive(self.vs_df, self.fs)
         self.medical_criteria["Abdominal"]["VCAbdomenSide"] = maf.viscous_criteria_abdomen_side(self.vs_df, self.fs)
         self.medical_criteria["Abdominal"]["VCAbdomenFrontalSens"] = maf.viscous_criteria_abdomen_frontal_sensitive(self.vs_df, self.fs)
         self.medical_criteria["Abdominal"]["VCAbdomenFrontal"] = maf.viscous_criteria_abdomen_frontal(self.vs_df, self.fs)
 
     def calc_pelvic(self):
-        self.medical_criteria["Pelvic"]["PSPFSide"] = mpf.maximal_lateral_pubic_symphysis_force(self.vs_df, self.fs)
-        self.medical_criteria["Pelvic"]["PSPFSideSens"] = mpf.maximal_lateral_pubic_symphysis_force_sensitive(self.vs_df, self.fs)
-        self.medical_criteria["Pelvic"]["PelvicRearAcc"] = mpf.max_pelvis_acceleration_rear(self.vs_df, self.fs)
-        self.medical_criteria["Pelvic"]["PelvicSideAcc"] = mpf.max_pelvis_acceleration_side(self.vs_df, self.fs)
+        self.medical_criteria["Pelvic"]["PSPFSide"] = mpf.maximal_lateral_pubic_symphysis_force(self.vs_df, self.fs, peaks=self.peaks_3ms)
+        self.medical_criteria["Pelvic"]["PSPFSideSens"] = mpf.maximal_lateral_pubic_symphysis_force_sensitive(self.vs_df, self.fs, peaks=self.peaks_3ms)
+        self.medical_criteria["Pelvic"]["PelvicRearAcc"] = mpf.max_pelvis_acceleration_rear(self.vs_df, self.fs, peaks=self.peaks_3ms)
+        self.medical_criteria["Pelvic"]["PelvicSideAcc"] = mpf.max_pelvis_acceleration_side(self.vs_df, self.fs, peaks=self.peaks_3ms)
 
     def calc_femur(self):  # Femur Force
-        self.medical_criteria["Femur"]["PAFFrontalSens"] = mff.femur_axial_force_sensitive(self.vs_df, self.fs)
-        self.medical_criteria["Femur"]["PAFFrontal"] = mff.femur_axial_force(self.vs_df, self.fs)
+        self.medical_criteria["Femur"]["PAFFrontalSens"] = mff.femur_axial_force_sensitive(self.vs_df, self.fs, peaks=self.peaks_3ms)
+        self.medical_criteria["Femur"]["PAFFrontal"] = mff.femur_axial_force(self.vs_df, self.fs, peaks=self.peaks_3ms)
 
     def calc_all_formulas(self):
         self.calc_head()
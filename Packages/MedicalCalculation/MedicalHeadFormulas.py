@@ -1,5 +1,6 @@
 import numpy as np
 import math
+from numpy.lib.stride_tricks import sliding_window_view
 from MedicalCalculation.Common import FormulaResult
 import MedicalCalculation.MedicalBasicFormulas as mbf
 
@@ -7,6 +8,39 @@ import MedicalCalculation.MedicalBasicFormulas as mbf
 # ---------------------------------------------- Head -----------------------------------------------------#
 
 # ---------- Head Injury Criteria - Front, Rear, Side ----------#  # abbreviation [HIC]
+def calc_hic_value(data, fs, win_time=0.015):
+    # data - resultant head acceleration [G], shape (T,) or a batch (N, T)
+    # [fs] = [Hz]
+    # win_time = [sec]
+    # returns the HIC of every row, same value as the start/end double loop over the windows
+
+    data = np.asarray(data, dtype=float)
+    batch = data.reshape(-1, data.shape[-1])
+    win = int(win_time * fs)
+    n_starts = batch.shape[1] - win
+    hic = np.zeros(batch.shape[0])
+    if n_starts <= 0 or win <= 0:
+        return hic if data.ndim > 1 else hic[0]
+
+    # sums of all the windows (start, length <= win), accumulated left to right like sum() over the slice
+    sums = np.cumsum(sliding_window_view(batch, win, axis=1)[:, :n_starts], axis=2)
+    lengths = np.arange(1, win + 1)
+    values = np.abs(1 / lengths * sums) ** 2.5 * lengths / fs
+    best = values.max(axis=(1, 2))
+
+    for row in range(batch.shape[0]):
+        if not best[row] > 0:
+            continue
+        # array pow may differ from the scalar pow in the last bit, the windows near the maximum are recomputed
+        # with the scalar expression so the result is exactly the one of the loop
+        for i_start, i_len in zip(*np.nonzero(values[row] >= best[row] * (1 - 1e-9))):
+            length = int(i_len) + 1
+            tmp = abs(1 / length * sum(batch[row, i_start:i_start + length])) ** 2.5 * length / fs
+            if tmp > hic[row]:
+                hic[row] = tmp
+    return hic if data.ndim > 1 else hic[0]
+
+
 def calc_hic(vs_df, fs, win_time=0.015):
     # data - sqrt(head_accx^2 + head_accy^2 + head_accz^2)
     # [fs] = [Hz]
@@ -19,20 +53,7 @@ def calc_hic(vs_df, fs, win_time=0.015):
 
     data = (vs_df["HEAD_ACX"].values ** 2 + vs_df["HEAD_ACY"].values ** 2 + vs_df["HEAD_ACZ"].values ** 2) ** 0.5
 
-    hic = 0
-    # t_start = 0
-    # t_end = 0
-    win = int(win_time * fs)
-
-    for i_start in range(len(data) - win):
-        # rng = range(i_start)
-        for i_end in range(i_start + 1, i_start + win + 1):
-            tmp1 = abs(1 / (i_end - i_start) * sum(data[i_start:i_end])) ** 2.5
-            tmp = tmp1 * (i_end - i_start) / fs
-            if tmp > hic:
-                hic = tmp
-                # t_start = i_start/fs
-                # t_end = i_end/fs
+    hic = calc_hic_value(data, fs, win_time)
 
     if hic < 1:
         return FormulaResult(value=int(hic))
@@ -26,12 +26,12 @@ def resultant_spinal_acceleration(vs_df, fs):
 
 # --------- Upper spine acceleration (T1) - Side ---------# ()
 
-def upper_spine_acceleration(vs_df, fs, age=45):
+def upper_spine_acceleration(vs_df, fs, age=45, peaks=None):
     for sensor in ["SPINLO_ACY"]:
         if not sensor in vs_df.keys():
             return None
 
-    t1_acy = mbf.calc_3ms(vs_df["SPINLO_ACY"].to_numpy().astype('float'), fs)
+    t1_acy = mbf.sensor_3ms(vs_df, "SPINLO_ACY", fs, peaks)
     p3ais = round(100 / (1 + math.exp(6.4606 - 0.0544 * age - 0.061 * t1_acy)))
     p4ais = round(100 / (1 + math.exp(7.9103 - 0.0544 * age - 0.061 * t1_acy)))
 
@@ -7,7 +7,7 @@ import MedicalCalculation.MedicalBasicFormulas as mbf
 # ----------------------------------------------- Neck ----------------------------------------------------#
 
 # --------- Neck Injury Criteria - Front, Rear, Side ----------#             # abbreviation [NIJFront]
-def neck_injury_criteria_frontal(vs_df, fs, Ften=4500, Fcom=4500, Mext=125, Mflex=310):
+def neck_injury_criteria_frontal(vs_df, fs, Ften=4500, Fcom=4500, Mext=125, Mflex=310, peaks=None):
     # df_neck - neck data frame with NECKUP_FOZ, NECKUP_MOY
     # fs = [Hz]
     # Ften,Fcom = [N]
@@ -17,8 +17,8 @@ def neck_injury_criteria_frontal(vs_df, fs, Ften=4500, Fcom=4500, Mext=125, Mfle
         if not sensor in vs_df.keys():
             return None
 
-    Fz = mbf.calc_3ms(vs_df["NECKUP_FOZ"].to_numpy().astype('float'), fs)
-    My = mbf.calc_3ms(vs_df["NECKUP_MOY"].to_numpy().astype('float'), fs)
+    Fz = mbf.sensor_3ms(vs_df, "NECKUP_FOZ", fs, peaks)
+    My = mbf.sensor_3ms(vs_df, "NECKUP_MOY", fs, peaks)
 
     Nte = Fz / Ften + My / Mext
     Ntf = Fz / Ften + My / Mflex
@@ -57,7 +57,7 @@ def neck_injury_criteria_frontal(vs_df, fs, Ften=4500, Fcom=4500, Mext=125, Mfle
     return FormulaResult(value=maxNij, ais2p=max(p2ais), ais3p=max(p3ais), ais4p=max(p4ais), ais5p=max(p5ais), limit=limit)
 
 # --------- Neck Injury Criteria - Front, Rear, Side ----------#             # abbreviation [NIJSide]
-def neck_injury_criteria_lateral(vs_df, fs, Ften=6810, Fcom=6160, Mr=60, Ml=60):
+def neck_injury_criteria_lateral(vs_df, fs, Ften=6810, Fcom=6160, Mr=60, Ml=60, peaks=None):
     # df_neck - neck data frame with NECKUP_FOZ, NECKUP_MOX
     # fs = [Hz]
     # Ften,Fcom = [N]
@@ -67,8 +67,8 @@ def neck_injury_criteria_lateral(vs_df, fs, Ften=6810, Fcom=6160, Mr=60, Ml=60):
         if not sensor in vs_df.keys():
             return None
 
-    Fz = mbf.calc_3ms(vs_df["NECKUP_FOZ"].to_numpy().astype('float'), fs)
-    Mx = mbf.calc_3ms(vs_df["NECKUP_MOX"].to_numpy().astype('float'), fs)
+    Fz = mbf.sensor_3ms(vs_df, "NECKUP_FOZ", fs, peaks)
+    Mx = mbf.sensor_3ms(vs_df, "NECKUP_MOX", fs, peaks)
 
     Ntl = Fz / Ften + Mx / Ml
     Ntr = Fz / Ften + Mx / Mr
@@ -171,7 +171,7 @@ def nkm_Rear(vs_df, fs, Fneg=845, Fpos=845, Mext=47.5, Mflex=88.1):
 
 
 # -------- Multi-axial neck injury criteria - Frontal, Side, Rear --------#  # abbreviation [MANIC]
-def manic(vs_df, fs, mechanism, model='human'):
+def manic(vs_df, fs, mechanism, model='human', peaks=None):
     # df - data frame with:
     # frontal: NECKUP_FOX, NECKUP_FOY, NECKUP_FOZ, NECKUP_MOY
     # side: NECKUP_FOX, NECKUP_FOY, NECKUP_FOZ, NECKUP_MOX, NECKUP_MOZ
@@ -199,7 +199,7 @@ def manic(vs_df, fs, mechanism, model='human'):
     Mycrit_p = 310
     Mycrit_n = 135
     Mzcrit = 135
-    Fz = mbf.calc_3ms(vs_df["NECKUP_FOZ"].to_numpy().astype('float'), fs)
+    Fz = mbf.sensor_3ms(vs_df, "NECKUP_FOZ", fs, peaks)
     if Fz >= 0:
         Fzn = Fz / Fzcrit_p
     else:
@@ -208,7 +208,7 @@ def manic(vs_df, fs, mechanism, model='human'):
         #Fy = calc_3ms(vs_df["NECKUP_FOY"].to_numpy().astype('float'), fs)
         #Fyn = Fy / Fycrit
         Fyn = 0
-        My = mbf.calc_3ms(vs_df["NECKUP_MOY"].to_numpy().astype('float'), fs)
+        My = mbf.sensor_3ms(vs_df, "NECKUP_MOY", fs, peaks)
         if My >= 0:
             Myn = My / Mycrit_p
         else:
@@ -216,15 +216,15 @@ def manic(vs_df, fs, mechanism, model='human'):
         Mxn = 0
         Mzn = 0
     elif 'Side' in mechanism:
-        Fy = mbf.calc_3ms(vs_df["NECKUP_FOY"].to_numpy().astype('float'), fs)
+        Fy = mbf.sensor_3ms(vs_df, "NECKUP_FOY", fs, peaks)
         Fyn = Fy / Fycrit
-        Mx = mbf.calc_3ms(vs_df["NECKUP_MOX"].to_numpy().astype('float'), fs)
+        Mx = mbf.sensor_3ms(vs_df, "NECKUP_MOX", fs, peaks)
         Mxn = Mx / Mxcrit
-        Mz = mbf.calc_3ms(vs_df["NECKUP_MOZ"].to_numpy().astype('float'), fs)
+        Mz = mbf.sensor_3ms(vs_df, "NECKUP_MOZ", fs, peaks)
         Mzn = Mz / Mzcrit
         Myn = 0
     elif mechanism == 'Rear':
-        My = mbf.calc_3ms(vs_df["NECKUP_MOY"].to_numpy().astype('float'), fs)
+        My = mbf.sensor_3ms(vs_df, "NECKUP_MOY", fs, peaks)
         if My >= 0:
             Myn = My / Mycrit_p
         else:
@@ -310,11 +310,11 @@ def neck_shear_force(vs_df, fs):
 
 
 # ---------- Neck Tension Force: [Neck Tension] = [kN] ----------#           # abbreviation [NTensionF]
-def neck_tension_force(vs_df, fs):
+def neck_tension_force(vs_df, fs, peaks=None):
     if not "NECKUP_FOZ" in vs_df.keys():
         return None
 
-    neckTensionForce = mbf.calc_3ms(vs_df["NECKUP_FOZ"], fs) / 1000  # [kN]
+    neckTensionForce = mbf.sensor_3ms(vs_df, "NECKUP_FOZ", fs, peaks) / 1000  # [kN]
 
     if 1.2 <= neckTensionForce <= 2.5:
         tensionFlag = 1
@@ -327,11 +327,11 @@ def neck_tension_force(vs_df, fs):
 
 
 # ---------- Neck Compression Force: [Neck Compression] = [kN] ----------#   # abbreviation [NCompressionF]
-def neck_compression_force(vs_df, fs):
+def neck_compression_force(vs_df, fs, peaks=None):
     if not "NECKUP_FOZ" in vs_df.keys():
         return None
 
-    neckCompressionForce = mbf.calc_3ms(vs_df["NECKUP_FOZ"], fs) / 1000  # [kN]
+    neckCompressionForce = mbf.sensor_3ms(vs_df, "NECKUP_FOZ", fs, peaks) / 1000  # [kN]
 
     if 1.5 <= neckCompressionForce <= 2.8:
         compressionFlag = 1
@@ -344,13 +344,13 @@ def neck_compression_force(vs_df, fs):
 
 
 # ---------- Neck Extension Force: [Neck Extention] = [Nm] ----------#       # abbreviation [NExtensionF]
-def neck_extension_force(vs_df, fs):
+def neck_extension_force(vs_df, fs, peaks=None):
     # vs_df - data frame with all virtual sensors
     # neckExtensionForce = [Nm]
     if not "NECKUP_MOY" in vs_df.keys():
         return None
 
-    neckExtensionForce = mbf.calc_3ms(vs_df["NECKUP_MOY"], fs)  # [Nm]
+    neckExtensionForce = mbf.sensor_3ms(vs_df, "NECKUP_MOY", fs, peaks)  # [Nm]
 
     if 38 <= neckExtensionForce <= 42:
         extensionFlag = 1
@@ -365,13 +365,13 @@ def neck_extension_force(vs_df, fs):
 
 
 # ---------- Neck Flexion Force: [Neck Flexion] = [Nm] ----------#           # abbreviation [NFlexionF]
-def neck_flexion_force(vs_df, fs):
+def neck_flexion_force(vs_df, fs, peaks=None):
     # vs_df - data frame with all virtual sensors
     # neckExtensionForce = [Nm]
     if not "NECKUP_MOY" in vs_df.keys():
         return None
 
-    neckFlexionForce = mbf.calc_3ms(vs_df["NECKUP_MOY"], fs)  # [Nm]
+    neckFlexionForce = mbf.sensor_3ms(vs_df, "NECKUP_MOY", fs, peaks)  # [Nm]
 
     if 61 <= neckFlexionForce <= 88:
         flexionFlag = 1
@@ -385,7 +385,7 @@ def neck_flexion_force(vs_df, fs):
     return FormulaResult(value=neckFlexionForce, limit=flexionFlag)
 
 # --------- Lower Neck Injury Criteria - Rear ----------#             # abbreviation [LNIJRear]
-def neck_injury_criteria_rear(vs_df, fs, H3Fcrit=565, THORFcrit=342, H3Mcrit=117, THORMcrit=85):
+def neck_injury_criteria_rear(vs_df, fs, H3Fcrit=565, THORFcrit=342, H3Mcrit=117, THORMcrit=85, peaks=None):
     # df_neck - neck data frame with NECKLO_FOZ,NECKLO_FOX, NECKLO_MOY
     # fs = [Hz]
     # Fcrit = [N]
@@ -395,9 +395,9 @@ def neck_injury_criteria_rear(vs_df, fs, H3Fcrit=565, THORFcrit=342, H3Mcrit=117
         if not sensor in vs_df.keys():
             return None
 
-    Fz = mbf.calc_3ms(vs_df["NECKLO_FOZ"].to_numpy().astype('float'), fs)
-    Fx = mbf.calc_3ms(vs_df["NECKLO_FOX"].to_numpy().astype('float'), fs)
-    My = mbf.calc_3ms(vs_df["NECKLO_MOY"].to_numpy().astype('float'), fs)
+    Fz = mbf.sensor_3ms(vs_df, "NECKLO_FOZ", fs, peaks)
+    Fx = mbf.sensor_3ms(vs_df, "NECKLO_FOX", fs, peaks)
+    My = mbf.sensor_3ms(vs_df, "NECKLO_MOY", fs, peaks)
 
     H3LNz = Fz / H3Fcrit + My / H3Mcrit
     H3LNx = Fx / H3Fcrit + My / H3Mcrit
@@ -5,12 +5,12 @@ import MedicalCalculation.MedicalBasicFormulas as mbf
 # ------------------------------------------------ Pelvic ---------------------------------------------------#
 
 # ---------- (Pubic F) Maximal lateral pubic symphysis force, [max_pelv_fy] = [N] -----------## [abbreviation: PSPFSide]
-def maximal_lateral_pubic_symphysis_force(vs_df, fs, age=45):    # not yet trained
+def maximal_lateral_pubic_symphysis_force(vs_df, fs, age=45, peaks=None):    # not yet trained
     for sensor in ["PELVUP_FOY"]:
         if not sensor in vs_df.keys():
             return None
 
-    max_pelv_fy = mbf.calc_3ms(vs_df["PELVUP_FOY"].to_numpy().astype('float'), fs)
+    max_pelv_fy = mbf.sensor_3ms(vs_df, "PELVUP_FOY", fs, peaks)
 
     # old formulas
     # p2ais = round(100 / (1 + math.exp(
@@ -37,12 +37,12 @@ def maximal_lateral_pubic_symphysis_force(vs_df, fs, age=45):    # not yet train
     return FormulaResult(value=max_pelv_fy, ais3p=p3ais, limit=limit)
 
 # ----- (Pubic F) Sensitive_Maximal_lateral_pubic_symphysis_force, [max_pelv_fy] = [N] ---- [abbreviation: PSPFSideSens]
-def maximal_lateral_pubic_symphysis_force_sensitive(vs_df, fs):    # not yet trained
+def maximal_lateral_pubic_symphysis_force_sensitive(vs_df, fs, peaks=None):    # not yet trained
     for sensor in ["PELVUP_FOY"]:
         if not sensor in vs_df.keys():
             return None
 
-    max_pelv_fy = mbf.calc_3ms(vs_df["PELVUP_FOY"].to_numpy().astype('float'), fs)
+    max_pelv_fy = mbf.sensor_3ms(vs_df, "PELVUP_FOY", fs, peaks)
 
     # sensitive version
     max_pelv_fy = max_pelv_fy / 1000  # [KN]
@@ -58,14 +58,14 @@ def maximal_lateral_pubic_symphysis_force_sensitive(vs_df, fs):    # not yet tra
     return FormulaResult(value=max_pelv_fy, limit=limit)
 
 # ---------- (Rear Acc) Maximal rear acceleration on pelvic  [acc]=[g]-----------#      # [abbreviation: PelvicRearAcc]
-def max_pelvis_acceleration_rear(vs_df, fs):
+def max_pelvis_acceleration_rear(vs_df, fs, peaks=None):
     for sensor in ["PELVUP_ACX", "PELVUP_ACY", "PELVUP_ACZ"]:
         if not sensor in vs_df.keys():
             return None
 
-    max_pelv_acx = mbf.calc_3ms(vs_df["PELVUP_ACX"].to_numpy().astype('float'), fs)
-    max_pelv_acy = mbf.calc_3ms(vs_df["PELVUP_ACY"].to_numpy().astype('float'), fs)
-    max_pelv_acz = mbf.calc_3ms(vs_df["PELVUP_ACZ"].to_numpy().astype('float'), fs)
+    max_pelv_acx = mbf.sensor_3ms(vs_df, "PELVUP_ACX", fs, peaks)
+    max_pelv_acy = mbf.sensor_3ms(vs_df, "PELVUP_ACY", fs, peaks)
+    max_pelv_acz = mbf.sensor_3ms(vs_df, "PELVUP_ACZ", fs, peaks)
 
     max_pelv_acc = max(max_pelv_acx, max_pelv_acy, max_pelv_acz)
 
@@ -87,14 +87,14 @@ def max_pelvis_acceleration_rear(vs_df, fs):
     return FormulaResult(value=max_pelv_acc, limit=limit)
 
 # ---------- (Lateral Acc) Maximal lateral acceleration on pelvic  [acc]=[g]----------- [abbreviation: PelvicSideAcc]
-def max_pelvis_acceleration_side(vs_df, fs):
+def max_pelvis_acceleration_side(vs_df, fs, peaks=None):
     for sensor in ["LUSP_ACX", "LUSP_ACY", "LUSP_ACZ"]: # This sensors are from the lower spine it can be also "spinelow"
         if not sensor in vs_df.keys():
             return None
 
-    max_pelv_acx = mbf.calc_3ms(vs_df["LUSP_ACX"].to_numpy().astype('float'), fs)
-    max_pelv_acy = mbf.calc_3ms(vs_df["LUSP_ACY"].to_numpy().astype('float'), fs)
-    max_pelv_acz = mbf.calc_3ms(vs_df["LUSP_ACZ"].to_numpy().astype('float'), fs)
+    max_pelv_acx = mbf.sensor_3ms(vs_df, "LUSP_ACX", fs, peaks)
+    max_pelv_acy = mbf.sensor_3ms(vs_df, "LUSP_ACY", fs, peaks)
+    max_pelv_acz = mbf.sensor_3ms(vs_df, "LUSP_ACZ", fs, peaks)
 
     max_pelv_acc = max(max_pelv_acx, max_pelv_acy, max_pelv_acz)
 
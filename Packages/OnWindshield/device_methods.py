@@ -1,5 +1,11 @@
 import numpy as np
 import torch
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    import bottleneck as bn
+except ImportError:
+    bn = None
 
 
 
@@ -7,45 +13,55 @@ class DeviceMethods:
     
     @staticmethod
     def crash_index(acc_norm,configs):
-        crash_energy = configs["crash_energy"]
+        """
+        :return: index of the first sample above crash_energy, the last index when there is none
+        """
+        above = np.asarray(acc_norm) > configs["crash_energy"]
+        return int(np.argmax(above)) if above.any() else len(above) - 1
+
+    @staticmethod
+    def moving_range(acc, win_size):
+        """
+        :param acc: [T, C] signal
+        :return: [T - win_size + 1, C] max - min of every window of win_size samples, by window start
+        """
+        if bn is not None:
+            return (bn.move_max(acc, win_size, axis=0) - bn.move_min(acc, win_size, axis=0))[win_size - 1:]
+        windows = sliding_window_view(acc, win_size, axis=0)
+        return windows.max(axis=-1) - windows.min(axis=-1)
 
-        for i,val in enumerate(acc_norm):
-            if val > crash_energy:
-                break
-        return i
-    
     @staticmethod
     def find_a0(acc,configs):
         """
         find a window where the car is standing still (in a rest <=> only normal force is active)
+        all the windows before the crash are scored at once: a window qualifies when its norm stays within
+        acc_noise_tolerance_on_norm of 1 g and every axis within acc_noise_tolerance of itself, every qualifying
+        window tightens the tolerance to its own range - so a0 is the mean of the last window of minimal range
         """
         # read configs:
         a0_win_size = configs["a0_win_size"]
         norm_tolerance = configs["acc_noise_tolerance_on_norm"]
         noise_tolerance = configs["acc_noise_tolerance"]
-        
-        a0 = None
+
+        acc = np.asarray(acc)
         acc_norm = np.linalg.norm(acc, axis=1)
-        # choose signal before crash
+        # choose signal before crash, the windows start at 0 .. crash_ind - a0_win_size - 1
         crash_ind = DeviceMethods.crash_index(acc_norm,configs)
-        acc = acc.iloc[:,:crash_ind]
-        acc_norm = acc_norm[:crash_ind]
-        
-        for i in range(len(acc_norm) - a0_win_size): 
-            # norm
-            curr_wind = acc_norm[i:i+a0_win_size]
-            if not (abs(curr_wind - 1) <= norm_tolerance).all(): 
-                continue
-            # absolute value
-            curr_wind = acc.iloc[i:i+a0_win_size].to_numpy()
-            max_vals = np.max(curr_wind,axis=0)
-            min_vals = np.min(curr_wind,axis=0)
-            if not (abs(max_vals - min_vals) <= noise_tolerance).all(): 
-                continue
-            a0 = np.mean(curr_wind, axis=0).tolist()
-            noise_tolerance = max(abs(max_vals - min_vals))
-
-        return a0
+        num_windows = crash_ind - a0_win_size
+        if num_windows <= 0:
+            return None
+        acc = acc[:crash_ind]
+        # norm: windows without a sample out of the tolerance, by the cumulative count of those samples
+        out_of_norm = np.concatenate(([0], np.cumsum(~(np.abs(acc_norm[:crash_ind] - 1) <= norm_tolerance))))
+        norm_ok = (out_of_norm[a0_win_size:] - out_of_norm[:-a0_win_size])[:num_windows] == 0
+        # absolute value
+        ranges = DeviceMethods.moving_range(acc, a0_win_size)[:num_windows]
+        qualifying = np.flatnonzero(norm_ok & (np.abs(ranges) <= noise_tolerance).all(axis=1))
+        if len(qualifying) == 0:
+            return None
+        max_range = np.abs(ranges[qualifying]).max(axis=1)
+        i = qualifying[np.flatnonzero(max_range == max_range.min())[-1]]
+        return np.mean(acc[i:i+a0_win_size], axis=0).tolist()
 
     @staticmethod
     def is_bp(button_signal):
@@ -1 +1,3 @@
-from SignalProcessing.signal_processing import SignalProcessing
\ No newline at end of file
+from SignalProcessing.signal_processing import SignalProcessing
+from SignalProcessing.signal_core import SignalCore, SignalArray
+from SignalProcessing.prepared_event import PreparedEvent
@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+from SignalProcessing.signal_core import SignalCore, SignalArray
+from SignalProcessing.signal_processing import SignalProcessing as sp
+
+
+class PreparedEvent:
+    """
+    One event's signal, shared by the packages of the pipeline.
+    The offset-corrected FRD rotation is computed once and the derived views (filtered at a cutoff, aligned to a
+    length) are memoized, so packages asking for the same view share it instead of recomputing it.
+    The *_array views are computed with SignalCore on ndarrays, the DataFrame views are adapters over them.
+    Returned arrays and DataFrames are shared between the packages - treat them as read-only.
+    """
+    ACC_COLUMNS = ['Acc_X', 'Acc_Y', 'Acc_Z']
+    FRD_COLUMNS = {'Acc_X': 'X', 'Acc_Y': 'Y', 'Acc_Z': 'Z'}
+
+    def __init__(self, raw_signal, calib_info_obj, OffSet, dtype=None):
+        """
+        :param raw_signal: rawData_df with columns Acc_X, Acc_Y, Acc_Z, Gyro_X, Gyro_Y, Gyro_Z
+        :param calib_info_obj: {"OperationalMat": 3x3, "AxesOrientation": "FLU", ...}
+        :param OffSet: [array] x, y, z offset in bits
+        :param dtype: float dtype of the views, default the dtype of the raw acceleration
+        """
+        self.raw = raw_signal
+        self.dtype = np.dtype(dtype) if dtype is not None else SignalCore.float_dtype(
+            raw_signal.loc[:, self.ACC_COLUMNS].to_numpy())
+        self.calib_info = calib_info_obj
+        self.op_matrix = np.array(calib_info_obj["OperationalMat"])
+        self.axes_orientation = calib_info_obj["AxesOrientation"]
+        self.offset = OffSet
+        # offset, rotation and FRD sign flips as one transform, shared by the events of the same calibration
+        self.transform = SignalCore.rotation_transform(self.op_matrix, sp.bit_to_offset(OffSet),
+                                                       input_orientation=self.axes_orientation,
+                                                       output_orientation="FRD")
+        self._views = dict()
+
+    def _memoize(self, key, compute):
+        view = self._views.get(key)
+        if view is None:
+            # concurrent stages may both compute a missing view, the first stored one wins
+            view = self._views.setdefault(key, compute())
+        return view
+
+    def rotated_array(self, sensors=None):
+        """
+        :param sensors: acceleration columns, default Acc_X, Acc_Y, Acc_Z
+        :return: [T, len(sensors)] offset-corrected acceleration rotated to FRD
+        """
+        sensors = tuple(sensors if sensors is not None else self.ACC_COLUMNS)
+
+        def compute():
+            data = self.raw.loc[:, list(sensors)].to_numpy(dtype=self.dtype, copy=True)
+            return SignalCore.apply_transform(data, self.transform, out=data)
+        return self._memoize(("rotated_array", sensors), compute)
+
+    def rotated(self, sensors=None):
+        """
+        :param sensors: acceleration columns, default Acc_X, Acc_Y, Acc_Z
+        :return: offset-corrected acceleration rotated to FRD, original column names
+        """
+        sensors = tuple(sensors if sensors is not None else self.ACC_COLUMNS)
+        return self._memoize(("rotated", sensors), lambda: pd.DataFrame(
+            self.rotated_array(sensors), index=self.raw.index, columns=list(sensors)))
+
+    def frd_array(self, columns=('X', 'Y', 'Z'), bias=None):
+        """
+        :param columns: subset of X, Y, Z
+        :param bias: {column: value} added to the column, e.g. {"Z": 1} to add gravity back
+        :return: [T, len(columns)] rotated signal
+        """
+        key = ("frd_array", tuple(columns), tuple(sorted((bias or {}).items())))
+
+        def compute():
+            axes = list(self.FRD_COLUMNS.values())
+            data = self.rotated_array()[:, [axes.index(col) for col in columns]]
+            for col, value in (bias or {}).items():
+                data[:, list(columns).index(col)] += value
+            return data
+        return self._memoize(key, compute)
+
+    def frd(self, columns=('X', 'Y', 'Z'), bias=None):
+        """
+        :return: frd_array as a DataFrame with columns X, Y, Z
+        """
+        key = ("frd", tuple(columns), tuple(sorted((bias or {}).items())))
+        return self._memoize(key, lambda: pd.DataFrame(self.frd_array(columns, bias), index=self.raw.index,
+                                                       columns=list(columns)))
+
+    def filtered_array(self, cutoffFreq, fs, outFs=None, columns=('X', 'Y', 'Z'), bias=None):
+        """
+        :param cutoffFreq: low pass cutoff [Hz]
+        :param fs: sampling rate of the event [Hz]
+        :param outFs: resample to outFs before filtering when it differs from fs
+        :return: SignalArray of the columns, resampled and low pass filtered as sp.smooth_dataset_filter
+        """
+        outFs = outFs if outFs is not None else fs
+        key = ("filtered_array", cutoffFreq, fs, outFs, tuple(columns), tuple(sorted((bias or {}).items())))
+
+        def compute():
+            data = self.frd_array(columns, bias)
+            # time axis of sp.insert_time_column, the filter rate is read back from it like from the DataFrame
+            time = self.raw.index.to_numpy() / fs
+            if outFs != fs:
+                inFs = int(np.round(1 / (time[1] - time[0])))
+                up, down = SignalCore.resample_ratio(inFs, outFs)
+                data = SignalCore.resample_poly(data, inFs, up, down)
+                time = SignalCore.resample_time(time, inFs, up, down)
+            return SignalArray(SignalCore.lowpass(data, SignalCore.calc_fs(time), cutoffFreq), outFs, columns, time)
+        return self._memoize(key, compute)
+
+    def filtered(self, cutoffFreq, fs, outFs=None, columns=('X', 'Y', 'Z'), bias=None):
+        """
+        :return: filtered_array as a DataFrame, Time_axis + columns
+        """
+        outFs = outFs if outFs is not None else fs
+        key = ("filtered", cutoffFreq, fs, outFs, tuple(columns), tuple(sorted((bias or {}).items())))
+        return self._memoize(key, lambda: self.filtered_array(cutoffFreq, fs, outFs, columns, bias).to_frame(
+            index=self.raw.index if outFs == fs else None))
+
+    def aligned_array(self, size, cutoffFreq, fs, outFs=None, columns=('X', 'Y', 'Z'), bias=None):
+        """
+        :param size: output length in samples, centered around the max energy sample
+        :return: [size, len(columns)] window of the filtered view, aligned as sp.alignment_signal
+        """
+        outFs = outFs if outFs is not None else fs
+        key = ("aligned_array", size, cutoffFreq, fs, outFs, tuple(columns), tuple(sorted((bias or {}).items())))
+        return self._memoize(key, lambda: SignalCore.align(
+            self.filtered_array(cutoffFreq, fs, outFs, columns, bias).data, size))
+
+    def aligned(self, size, cutoffFreq, fs, outFs=None, columns=('X', 'Y', 'Z'), bias=None):
+        """
+        :return: Time_axis + columns of the filtered view, aligned by sp.alignment_signal
+        """
+        outFs = outFs if outFs is not None else fs
+        key = ("aligned", size, cutoffFreq, fs, outFs, tuple(columns), tuple(sorted((bias or {}).items())))
+        return self._memoize(key, lambda: sp.alignment_signal(
+            self.filtered(cutoffFreq, fs, outFs, columns, bias), size=size))
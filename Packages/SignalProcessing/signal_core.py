@@ -0,0 +1,321 @@
+import numpy as np
+import pandas as pd
+from scipy import signal
+from functools import lru_cache
+from Utils import LogLevel, DSLogger
+
+
+@lru_cache(maxsize=128)
+def _design_fir(nCoeff, cutoff, pass_zero):
+    # firwin taps shared by every caller with the same design, read-only so no caller can alter the cached copy
+    taps = signal.firwin(nCoeff, list(cutoff) if isinstance(cutoff, tuple) else cutoff, width=None,
+                         pass_zero=pass_zero)
+    taps.flags.writeable = False
+    return taps
+
+
+class SignalArray:
+    """
+    [T, nColumns] signal samples with their sample rate, column names and time axis, without a time column.
+    The ndarray counterpart of the [Time_axis, columns...] DataFrames of SignalProcessing.
+    """
+    TIME_COLUMN = 'Time_axis'
+
+    def __init__(self, data, fs, columns, time=None):
+        """
+        :param data: [T, nColumns] array
+        :param fs: sample rate [Hz]
+        :param columns: names of the data columns
+        :param time: [T] time axis [sec], default sample index / fs
+        """
+        self.data = data
+        self.fs = fs
+        self.columns = tuple(columns)
+        self.time = time if time is not None else np.arange(data.shape[0]) / fs
+
+    def to_frame(self, index=None):
+        """
+        :return: DataFrame with Time_axis followed by the columns
+        """
+        return pd.DataFrame(np.column_stack((self.time, self.data)), index=index,
+                            columns=[self.TIME_COLUMN] + list(self.columns))
+
+
+class SignalCore:
+    """
+    ndarray implementation of the SignalProcessing operations.
+    Signals are [T, nColumns] arrays of sensor columns only, the sample rate is passed explicitly;
+    the DataFrame methods of SignalProcessing are adapters over these.
+    Float signals are processed in their own precision (float32 stays float32), others as float64.
+    """
+
+    @classmethod
+    def float_dtype(cls, data):
+        """
+        :return: dtype the core computes data in - its own float dtype, float64 for anything else
+        """
+        dtype = np.asarray(data).dtype
+        return dtype if np.issubdtype(dtype, np.floating) else np.dtype(np.float64)
+
+    @classmethod
+    def calc_fs(cls, time):
+        # sample rate read back from a time axis [sec], rounded like the DataFrame time columns
+        time = np.asarray(time).astype('float32')
+        return np.unique(1 / np.round(np.diff(time[time > 0]), 5))[0]
+
+    @classmethod
+    def lowpass_taps(cls, fs, cutoffFreq, nCoeff=1024):
+        return _design_fir(nCoeff, float(cutoffFreq / (fs / 2)), True)
+
+    @classmethod
+    def select_filter_engine(cls, nSamples, nTaps):
+        """
+        picks the convolution engine by signal length and tap count
+        :return: 'direct' (np.convolve), 'fft' (signal.fftconvolve) or 'oa' (signal.oaconvolve)
+        """
+        # fft padding only pays off for long filters, and the 'same' output of the scipy engines is only
+        # the np.convolve one when the filter is not longer than the signal
+        if nTaps > nSamples or nTaps <= 128 or nSamples * nTaps < 400000:
+            return 'direct'
+        # overlap-add wins once the signal is much longer than the filter
+        if nSamples > 50 * nTaps:
+            return 'oa'
+        return 'fft'
+
+    @classmethod
+    def convolve_columns(cls, data, filter, mode='same', engine='auto'):
+        """
+        convolves every column of a 2-D array with filter in one call
+        :param data: [T, nColumns] array
+        :param engine: 'auto', 'direct', 'fft' or 'oa'
+        :return: [T', nColumns] array, T' according to mode as in np.convolve
+        """
+        # taps in the precision of the signal, a float32 signal is filtered in float32
+        filter = np.asarray(filter, dtype=cls.float_dtype(data))
+        if engine == 'auto':
+            engine = cls.select_filter_engine(data.shape[0], filter.shape[0])
+        if engine == 'direct':
+            return np.column_stack([np.convolve(data[:, iCol], filter, mode) for iCol in range(data.shape[1])])
+        if engine == 'fft':
+            return signal.fftconvolve(data, filter[:, None], mode=mode, axes=0)
+        if engine == 'oa':
+            return signal.oaconvolve(data, filter[:, None], mode=mode, axes=0)
+        raise ValueError(f"unknown filter engine {engine}")
+
+    @classmethod
+    def lowpass(cls, data, fs, cutoffFreq, nCoeff=None, engine='auto'):
+        """
+        low pass FIR of every column, 'same' length
+        :param nCoeff: default min(512, T) rounded down to even, as in smooth_dataset_filter
+        """
+        if nCoeff is None:
+            nCoeff = min(512, data.shape[0] // 2 * 2)
+        return cls.convolve_columns(data, cls.lowpass_taps(fs, cutoffFreq, nCoeff), 'same', engine)
+
+    @classmethod
+    def lowpass_batch(cls, data, fs, cutoffFreq, nCoeff=None, engine='auto'):
+        """
+        lowpass of a batch of events of the same length, all the events and columns in one convolution call
+        :param data: [N, T, nColumns] array
+        :return: [N, T, nColumns] array
+        """
+        nEvents, nSamples, nColumns = data.shape
+        columns = data.transpose(1, 0, 2).reshape(nSamples, nEvents * nColumns)
+        filtered = cls.lowpass(columns, fs, cutoffFreq, nCoeff, engine)
+        return filtered.reshape(nSamples, nEvents, nColumns).transpose(1, 0, 2)
+
+    @classmethod
+    def resample_ratio(cls, inFs, outFs=None, sampRatioN=1, sampRatioD=2):
+        """
+        :return: (up, down) factors from inFs to outFs, or the reduced sampRatioN / sampRatioD when outFs is None
+        """
+        if outFs is not None:
+            gcdFactor = np.gcd(inFs, outFs)
+            if gcdFactor == 1:
+                DSLogger("SignalProcessing_log").PrintLog(
+                    LogLevel.Warning, f"resample: no exact ratio from {inFs} to {outFs} Hz, outFreq has changed")
+                if inFs > outFs:
+                    return 1, int(np.round(inFs / outFs))
+                return int(np.round(outFs / inFs)), 1
+            return int(outFs / gcdFactor), int(inFs / gcdFactor)
+        gcdFactor = np.gcd(sampRatioD, sampRatioN)
+        return int(sampRatioN / gcdFactor), int(sampRatioD / gcdFactor)
+
+    @classmethod
+    def resample_poly(cls, data, inFs, up, down, initialSample=0, maxLpfCoeff=1024):
+        """
+        polyphase resampling of the columns of data by up / down, the zero-stuffed signal is never formed.
+        same output as upsample followed by downsample: zero-stuffing by up, low pass at the input nyquist
+        (create_lpf, 'same' convolution, gain of up) and keeping every down-th sample from initialSample
+        :param data: [T, nColumns] array, without the time column
+        :param inFs: sampling rate of data [Hz]
+        :return: [T', nColumns] array at inFs * up / down
+        """
+        data = np.asarray(data, dtype=cls.float_dtype(data))
+        if up == 1:
+            # no interpolation filter, plain decimation as in downsample
+            return data[initialSample::down]
+        nUp = data.shape[0] * up
+        upFs = inFs * up
+        nCoeff = min(nUp, maxLpfCoeff)
+        lpf = cls.lowpass_taps(upFs, 0.5 * upFs / up, nCoeff=nCoeff)
+
+        # 'same' keeps the full convolution from (nCoeff - 1) // 2, then every down-th sample from initialSample
+        kept = (nCoeff - 1) // 2 + initialSample + np.arange(len(range(initialSample, nUp, down))) * down
+        out = np.zeros((kept.shape[0], data.shape[1]), dtype=data.dtype)
+        for phase in range(min(up, nCoeff)):
+            rows = np.flatnonzero(kept % up == phase)
+            if rows.size == 0:
+                continue
+            # sample q * up + phase of the zero-stuffed convolution only sees the taps phase, phase + up, ...
+            sub = cls.convolve_columns(data, lpf[phase::up], mode='full')
+            q = kept[rows] // up
+            inside = q < sub.shape[0]
+            out[rows[inside]] = sub[q[inside]]
+        return out * up
+
+    @classmethod
+    def resample_time(cls, time, inFs, up, down, initialSample=0):
+        """
+        :return: time axis of resample_poly(..., up, down, initialSample) from the input time axis
+        """
+        if up > 1:
+            time = np.arange(time.shape[0] * up) * (1 / (inFs * up)) + time[0]
+        return time[initialSample::down]
+
+    @classmethod
+    def orientation_signs(cls, input_orientation, output_orientation='FRD'):
+        """
+        :return: [3] array, -1 for the axes whose direction differs between the orientations
+        """
+        if len(input_orientation) != 3 or len(output_orientation) != 3:
+            raise ValueError("orientation must be exactly 3 chars long")
+        for axis, options in enumerate((('F', 'R'), ('R', 'L'), ('U', 'D'))):
+            if input_orientation[axis] not in options:
+                raise ValueError(f"axis {axis} orientation must take {' or '.join(options)}, "
+                                 f"got {input_orientation[axis]}")
+        return np.array([-1.0 if i != o else 1.0 for i, o in zip(input_orientation, output_orientation)])
+
+    @classmethod
+    def rotation_transform(cls, operational_mat, offset, input_orientation='FLU', output_orientation='FRD'):
+        """
+        offset subtraction, rotation and axis sign flips fused into one affine transform, y = x @ matrix.T + bias.
+        computed once per calibration (the least recently used of 128 are dropped), the arrays are shared - read-only
+        :param offset: [3] offset in the units of the signal, subtracted before the rotation
+        :return: (matrix [3, 3], bias [3])
+        """
+        operational_mat = np.asarray(operational_mat, dtype=float)
+        offset = np.asarray(offset, dtype=float)
+        return cls._cached_transform(tuple(operational_mat.ravel()), tuple(offset), input_orientation,
+                                     output_orientation)
+
+    @classmethod
+    @lru_cache(maxsize=128)
+    def _cached_transform(cls, operational_mat, offset, input_orientation, output_orientation):
+        matrix = cls.orientation_signs(input_orientation, output_orientation)[:, None] * \
+            np.array(operational_mat).reshape(3, 3)
+        bias = -(matrix @ np.array(offset))
+        matrix.flags.writeable = False
+        bias.flags.writeable = False
+        return matrix, bias
+
+    @classmethod
+    def apply_transform(cls, data, transform, out=None):
+        """
+        :param data: [..., T, 3] acceleration of one event or a batch of events
+        :param transform: (matrix, bias) from rotation_transform
+        :param out: array to write the result to, may be data itself
+        :return: data @ matrix.T + bias
+        """
+        matrix, bias = transform
+        dtype = cls.float_dtype(data)
+        matrix, bias = matrix.astype(dtype, copy=False), bias.astype(dtype, copy=False)
+        out = np.matmul(data, matrix.T, out=out)
+        out += bias
+        return out
+
+    @classmethod
+    def rotate(cls, data, operational_mat, offset, input_orientation='FLU', output_orientation='FRD'):
+        """
+        :param data: [T, 3] acceleration
+        :param offset: [3] offset in the units of data, subtracted before the rotation
+        :return: [T, 3] offset-corrected acceleration rotated by operational_mat into output_orientation
+        """
+        return cls.apply_transform(data, cls.rotation_transform(operational_mat, offset, input_orientation,
+                                                                output_orientation))
+
+    @classmethod
+    def rotate_batch(cls, data, operational_mats, offsets, input_orientation='FLU', output_orientation='FRD'):
+        """
+        :param data: [N, T, 3] acceleration of N events
+        :param operational_mats: [N, 3, 3] per event, or [3, 3] shared by the batch
+        :param offsets: [N, 3] per event, or [3] shared by the batch, in the units of data
+        :return: [N, T, 3] offset-corrected acceleration of every event rotated into output_orientation
+        """
+        operational_mats = np.asarray(operational_mats, dtype=float)
+        offsets = np.asarray(offsets, dtype=float)
+        if operational_mats.ndim == 2 and offsets.ndim == 1:
+            return cls.rotate(data, operational_mats, offsets, input_orientation, output_orientation)
+        operational_mats = np.broadcast_to(operational_mats, (data.shape[0], 3, 3))
+        offsets = np.broadcast_to(offsets, (data.shape[0], 3))
+        transforms = [cls.rotation_transform(m, o, input_orientation, output_orientation)
+                      for m, o in zip(operational_mats, offsets)]
+        dtype = cls.float_dtype(data)
+        matrices = np.stack([matrix for matrix, _ in transforms]).astype(dtype, copy=False)
+        biases = np.stack([bias for _, bias in transforms]).astype(dtype, copy=False)
+        out = np.matmul(data, matrices.transpose(0, 2, 1))
+        out += biases[:, None, :]
+        return out
+
+    @classmethod
+    def max_energy_index(cls, data):
+        """
+        :param data: [T, nColumns], or [N, T, nColumns] for one index per event
+        """
+        return np.argmax(np.linalg.norm(data, axis=-1), axis=-1)
+
+    @classmethod
+    def align(cls, data, size=240, center=None):
+        """
+        window of int(size / 2) * 2 samples around center, zero padded past the ends of data
+        :param center: sample index, default the max energy sample of data
+        :return: [int(size / 2) * 2, nColumns] array
+        """
+        if center is None:
+            center = cls.max_energy_index(data)
+        half = int(size / 2)
+        out = np.zeros((2 * half, data.shape[1]), dtype=data.dtype)
+        start, stop = max(center - half, 0), min(center + half, data.shape[0])
+        out[start - (center - half):stop - (center - half)] = data[start:stop]
+        return out
+
+    @classmethod
+    def align_batch(cls, data, size=240, centers=None):
+        """
+        align of every event of a batch
+        :param data: [N, T, nColumns] array
+        :param centers: [N] sample indexes, default the max energy sample of every event
+        :return: [N, int(size / 2) * 2, nColumns] array
+        """
+        if centers is None:
+            centers = cls.max_energy_index(data)
+        half = int(size / 2)
+        padded = np.pad(data, ((0, 0), (half, half), (0, 0)))
+        # window of event n starts at centers[n] - half, shifted by the padding
+        rows = np.asarray(centers)[:, None] + np.arange(2 * half)[None, :]
+        return np.take_along_axis(padded, rows[:, :, None], axis=1)
+
+    @classmethod
+    def model_input_batch(cls, data, fs, cutoffFreq, size, bias=None):
+        """
+        lowpass and align a batch the way PreparedEvent.aligned_array does one event, channels first
+        :param data: [N, T, nColumns] rotated signal of the columns the model takes
+        :param bias: [nColumns] added to every sample before filtering, e.g. [0, 0, 1] to add gravity back to Z
+        :return: [N, nColumns, int(size / 2) * 2] array, the input layout of the VS, Damages and crash models
+        """
+        if bias is not None:
+            data = data + np.asarray(bias, dtype=cls.float_dtype(data))
+        # the filter is designed at the rate read back from the time axis, like the per event path
+        filter_fs = cls.calc_fs(np.arange(data.shape[1]) / fs)
+        aligned = cls.align_batch(cls.lowpass_batch(data, filter_fs, cutoffFreq), size)
+        return np.ascontiguousarray(aligned.transpose(0, 2, 1))
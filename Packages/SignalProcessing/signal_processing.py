@@ -5,9 +5,13 @@ if __debug__:
 from scipy import signal
 from scipy.fftpack import fft, fftfreq, fftshift, ifft
 import sys
+from SignalProcessing.signal_core import SignalCore, _design_fir
+
 
 #2Do
 class SignalProcessing:
+    OFFSET_STEP = 1 / 256  # g per offset bit, shared by the single event and the batch paths
+
     @classmethod
     def check_if_only_one_Fs(cls, df, timeCol=0):
         """
@@ -24,12 +28,12 @@ class SignalProcessing:
 
         # return np.round(np.mean(1 / ((df.diff(axis=0)).iloc[1:, timeCol])))
         if isinstance(df, pd.DataFrame):
-            time = df.iloc[:, timeCol].to_numpy().astype('float32')
+            time = df.iloc[:, timeCol].to_numpy()
         elif isinstance(df, np.ndarray):
-            time = df[:, timeCol].astype('float32')
+            time = df[:, timeCol]
         else:
             raise TypeError("input array should be either pd.DataFrame or np.ndarray")
-        return np.unique(1 / np.round(np.diff(time[time > 0]), 5))[0]
+        return SignalCore.calc_fs(time)
 
     @classmethod
     def quantize(cls, df, dq=0.5, method='floor'):
@@ -60,7 +64,7 @@ class SignalProcessing:
             print("Error,number of coeff. should be odd ")
             sys.exit(0)
         cutoff = cutoffFreq / (fs / 2)
-        hpf = signal.firwin(nCoeff, cutoff, width=None, pass_zero=False)
+        hpf = _design_fir(nCoeff, float(cutoff), False)
 
         if debugPltFlag and __debug__:
             freqsVec = np.linspace(-fs / 2, fs / 2, hpf.shape[0])
@@ -78,7 +82,7 @@ class SignalProcessing:
         # fs - sampling rate of the filter (equal to the signal that will be filtered)
         ### LP FILTER
         cutoff = cutoffFreq / (fs / 2)
-        lpf = signal.firwin(nCoeff, cutoff, width=None)
+        lpf = _design_fir(nCoeff, float(cutoff), True)
 
         if debugPltFlag and __debug__:
             freqsVec = np.linspace(-fs / 2, fs / 2, lpf.shape[0])
@@ -99,23 +103,44 @@ class SignalProcessing:
             print("Error, fStart must be grater than 0 , and fStop smaller than fs/2")
             sys.exit(0)
         else:
-            cutoff = [fStart / (fs / 2), fStop / (fs / 2)]
-            bpf = signal.firwin(nCoeff, cutoff, width=None, pass_zero=False)
+            cutoff = (float(fStart / (fs / 2)), float(fStop / (fs / 2)))
+            bpf = _design_fir(nCoeff, cutoff, False)
             return bpf
 
     @classmethod
-    def filter(cls, df, filter, mode='same'):
+    def fir_cache_info(cls):
+        """
+        :return: {"hits", "misses", "maxsize", "currsize"} of the FIR design cache behind create_lpf/hpf/bpf
+        """
+        return _design_fir.cache_info()._asdict()
+
+    @classmethod
+    def fir_cache_clear(cls):
+        _design_fir.cache_clear()
+
+    @classmethod
+    def select_filter_engine(cls, nSamples, nTaps):
+        return SignalCore.select_filter_engine(nSamples, nTaps)
+
+    @classmethod
+    def convolve_columns(cls, data, filter, mode='same', engine='auto'):
+        return SignalCore.convolve_columns(data, filter, mode, engine)
+
+    @classmethod
+    def filter(cls, df, filter, mode='same', engine='auto'):
         # filtering the input signal (data frame columns) with filter (given in time, same fs as df]
-        # first column of data frame is always time or sample number
-        nColumns = df.shape[-1]
+        # first column of data frame is always time or sample number, it is kept as is
+        # engine - 'auto' picks direct / fft / overlap-add convolution by size, see select_filter_engine
         if isinstance(df, pd.DataFrame):
-            outSig = df.copy(deep=True)
-            for iAxis in range(1, nColumns):
-                outSig.iloc[:, iAxis] = np.convolve(df.iloc[:, iAxis], filter, mode)
+            if mode != 'same':
+                raise ValueError("pd.DataFrame can only be filtered with mode='same'")
+            values = df.to_numpy(dtype=float)
+            filtered = SignalCore.convolve_columns(values[:, 1:], filter, mode, engine)
+            outSig = pd.DataFrame(np.column_stack((values[:, 0], filtered)), index=df.index, columns=df.columns)
         elif isinstance(df, np.ndarray):
-            outSig = np.apply_along_axis(lambda x: np.convolve(x, filter, mode), 0, df)
-            # for iAxis in range(1, nColumns):
-            #     outSig[:, iAxis] = np.convolve(df[:, iAxis], filter, mode)
+            filtered = SignalCore.convolve_columns(df[:, 1:], filter, mode, engine)
+            # the time column only lines up with the output in 'same' mode, otherwise just the filtered columns
+            outSig = np.column_stack((df[:, 0], filtered)) if mode == 'same' else filtered
         else:
             raise TypeError("input data can be only pd.DataFrame or np.ndarray")
         return outSig
@@ -250,7 +275,12 @@ class SignalProcessing:
         return upsampFilt
 
     @classmethod
-    def change_sampling_rate(cls, dfSig, inFs=None, outFs=None, sampRatioN=1, sampRatioD=2, initialSample=0):
+    def resample_poly(cls, data, inFs, up, down, initialSample=0, maxLpfCoeff=1024):
+        return SignalCore.resample_poly(data, inFs, up, down, initialSample, maxLpfCoeff)
+
+    @classmethod
+    def change_sampling_rate(cls, dfSig, inFs=None, outFs=None, sampRatioN=1, sampRatioD=2, initialSample=0,
+                             engine='polyphase'):
 
         #  Converts the sampling rate of the dfSig to outFs if given. Else the sampling rate of the output signal
         #  = inFs*(sampRatioN/sampRatioD)
@@ -258,6 +288,8 @@ class SignalProcessing:
         # inSig is a data-frame. Its columns assumed to be [timeAxis or sampleIndex, carAcc-xAxis, carAcc-yAxis, carAcc-zAxis]
         # first column is time if inFs=None, otherwise assumed to be #sample
 
+        # engine - 'polyphase' resamples with resample_poly, 'zero_stuff' with upsample + downsample
+
         # 2Do:
         # checking that df type is data frame
 
@@ -267,23 +299,21 @@ class SignalProcessing:
 
         if outFs is not None:
             assert type(outFs) == int, 'Outputput Frequency is not an integer'
-            gcdFactor = np.gcd(inFs, outFs)
-            if gcdFactor == 1:
-                print('outFreq has changed')
-                if inFs > outFs:
-                    sampRatioD = int(np.round(inFs / outFs))
-                    sampRatioN = 1
-                else:
-                    sampRatioN = int(np.round(outFs / inFs))
-                    sampRatioD = 1
-
-            else:
-                sampRatioD = int(inFs / gcdFactor)
-                sampRatioN = int(outFs / gcdFactor)
-        else:
-            gcdFactor = np.gcd(sampRatioD, sampRatioN)
-            sampRatioD = int(sampRatioD / gcdFactor)
-            sampRatioN = int(sampRatioN / gcdFactor)
+        sampRatioN, sampRatioD = SignalCore.resample_ratio(inFs, outFs, sampRatioN, sampRatioD)
+
+        if engine == 'polyphase':
+            if sampRatioN > 1:
+                assert ((inFs % sampRatioD) == 0)
+            # upsample alone does not decimate, so initialSample only applies when downsampling
+            start = initialSample if sampRatioD > 1 else 0
+            values = dfSig.to_numpy()
+            signalCols = SignalCore.resample_poly(values[:, 1:], int(inFs), sampRatioN, sampRatioD, start)
+            timeCol = SignalCore.resample_time(values[:, 0], int(inFs), sampRatioN, sampRatioD, start)
+            dfSigDS = pd.DataFrame(np.column_stack((timeCol, signalCols)), columns=dfSig.columns,
+                                   index=np.arange(signalCols.shape[0]))
+            return dfSigDS, inFs * sampRatioN / sampRatioD
+        elif engine != 'zero_stuff':
+            raise ValueError(f"unknown resampling engine {engine}")
 
         if sampRatioN > 1:
             assert ((inFs % sampRatioD) == 0)
@@ -308,36 +338,50 @@ class SignalProcessing:
         dfSigClipped.iloc[:, sensorsColInd] = dfSig.iloc[:, sensorsColInd].clip(-np.abs(clipTh), np.abs(clipTh))
         return dfSigClipped
 
+    @classmethod
+    def smooth_dataset_filter_batch(cls, data, fs, cutoffFreq, nCoeff=None):
+        """
+        :param data: [N, T, nColumns] signal columns of N events of the same length, no time column
+        :param fs: sample rate of the events [Hz]
+        :return: [N, T, nColumns] low pass filtered as smooth_dataset_filter
+        """
+        return SignalCore.lowpass_batch(data, fs, cutoffFreq, nCoeff)
+
     @classmethod
     def smooth_dataset_filter(cls, df, cutoffFreq, nCoeff =None):
         inFs = cls.calc_fs(df)
-        if nCoeff is None:
-            nCoeff = min(512, df.shape[0] // 2 * 2)
-        lpf = cls.create_lpf(inFs, cutoffFreq, nCoeff)
-        return cls.filter(df, lpf, mode='same')
+        values = df.to_numpy(dtype=float)
+        filtered = SignalCore.lowpass(values[:, 1:], inFs, cutoffFreq, nCoeff)
+        return pd.DataFrame(np.column_stack((values[:, 0], filtered)), index=df.index, columns=df.columns)
 
     @classmethod
     def _find_max_energy_index(cls, df):
         if isinstance(df, pd.DataFrame):
-            return np.argmax(np.linalg.norm(df.to_numpy()[:, 1:], axis=1))
+            return SignalCore.max_energy_index(df.to_numpy()[:, 1:])
         elif isinstance(df, np.ndarray):
-            return np.argmax(np.linalg.norm(df[:, 1:], axis=1))
+            return SignalCore.max_energy_index(df[:, 1:])
 
     @classmethod
     def alignment_signal(cls, df, size=240):
+        # window around the max energy sample of the signal columns, time column included
         if isinstance(df, pd.DataFrame):
-            df_new = np.pad(df.to_numpy(), ((size, size), (0, 0)), mode='constant', constant_values=0)
-            idx = cls._find_max_energy_index(df_new)
-            df_new = df_new[idx - int(size / 2):idx + int(size / 2), :]
-            df_new = pd.DataFrame(df_new, columns=df.columns)
+            values = df.to_numpy()
+            df_new = pd.DataFrame(SignalCore.align(values, size, cls._find_max_energy_index(values)),
+                                  columns=df.columns)
         elif isinstance(df, np.ndarray):
-            df_new = np.pad(df, ((size, size), (0, 0)), mode='constant', constant_values=0)
-            idx = cls._find_max_energy_index(df_new)
-            df_new = df_new[idx - int(size / 2):idx + int(size / 2), :]
+            df_new = SignalCore.align(df, size, cls._find_max_energy_index(df))
         else:
             raise TypeError("input data can be only pd.DataFrame or np.ndarray")
         return df_new
 
+    @classmethod
+    def alignment_signal_batch(cls, data, size=240):
+        """
+        :param data: [N, T, nColumns] signal columns of N events, no time column
+        :return: [N, int(size / 2) * 2, nColumns] window around the max energy sample of every event
+        """
+        return SignalCore.align_batch(data, size)
+
     @classmethod
     def align_axes(cls, data, input_orientation, output_orientation='FRD', sensors=['X', 'Y', 'Z']):
         # orientation is represented as a 3 char (uppercase) string
@@ -416,14 +460,14 @@ class SignalProcessing:
             return [df]
 
     @staticmethod
-    def offset_to_bit(offset,step=1/256):
+    def offset_to_bit(offset,step=OFFSET_STEP):
         bit_offset = [] 
         for v in offset:
             bit_offset.append(int(v/step))
         return bit_offset
     
     @staticmethod
-    def bit_to_offset(bit_offset, step = 1/256):
+    def bit_to_offset(bit_offset, step = OFFSET_STEP):
         offset = [] 
         for v in bit_offset:
             offset.append(v*step)
@@ -445,14 +489,25 @@ class SignalProcessing:
             operational_mat = np.array(operational_mat)
         offset = SignalProcessing.bit_to_offset(offset)
         if isinstance(df, pd.DataFrame):
-            df = df.loc[:, sensors]
-            df = SignalProcessing.shift(df, -np.array(offset), sensors)
-            df.loc[:, sensors] = df.to_numpy() @ operational_mat.T
-            df = cls.align_axes(df, input_orientation, output_orientation, sensors=sensors)
+            rotated = SignalCore.rotate(df.loc[:, sensors].to_numpy(dtype=float), operational_mat, offset,
+                                        input_orientation, output_orientation)
+            df = pd.DataFrame(rotated, index=df.index, columns=sensors)
         else:
             raise TypeError("input data can only be pd.DataFrame")
         return df
 
+    @classmethod
+    def rotate_signal_batch(cls, data, operational_mats, output_orientation, input_orientation='FLU', offsets=None):
+        """
+        :param data: [N, T, 3] acceleration of N events
+        :param operational_mats: [N, 3, 3] per event or [3, 3] for the whole batch
+        :param offsets: [N, 3] per event or [3] for the whole batch, x, y, z offset in bits
+        :return: [N, T, 3] rotated acceleration, as rotate_signal of every event
+        """
+        offsets = np.zeros(3) if offsets is None else np.asarray(offsets, dtype=float)
+        return SignalCore.rotate_batch(data, operational_mats, offsets * cls.OFFSET_STEP, input_orientation,
+                                       output_orientation)
+
 
 class Pipeline():
     def __init__(self, target_freq, smooth_freq=None, multCaseHeight=5, multCaseDist=50):
@@ -485,13 +540,3 @@ class Pipeline():
             signal_list.append(df1)
 
         return signal_list
-
-
-
-
-
-
-
-
-
-
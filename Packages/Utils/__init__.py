@@ -2,4 +2,5 @@
 from Utils.Ds_logger import LogLevel, DSLogger
 from Utils.JsonService import JsonService
 from Utils.io import IO
+from Utils.event_file import EventFile
 from Utils.DataProcessing import *
@@ -0,0 +1,109 @@
+import os
+import glob
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+
+
+class EventFile:
+    """
+    Binary columnar event: an 8 byte magic, the uint32 length of a JSON header, the header, padding to ALIGN bytes
+    and the signal columns one after the other (a [n_columns, T] array, row-major).
+    The header holds the scalar fields of the JSON event (TotalTimeRecorded, EventStartTime, EventType, ...)
+    and the layout of the columns. Loading memory-maps the columns, so signals is a zero-copy [T, n_columns] view.
+    """
+    MAGIC = b"IMPEVT01"
+    ALIGN = 64
+    EXTENSION = ".evb"
+    COLUMNS = ("Acc_X", "Acc_Y", "Acc_Z", "Gyro_X", "Gyro_Y", "Gyro_Z")
+
+    def __init__(self, header, signals):
+        """
+        :param header: {"Columns", "Samples", "Dtype", ...event scalar fields}
+        :param signals: [T, n_columns] array in the order of header["Columns"]
+        """
+        self.header = header
+        self.signals = signals
+
+    def get(self, key, default=None):
+        # the scalar event fields, like event.get on the JSON event dict
+        return self.header.get(key, default)
+
+    def __getitem__(self, key):
+        return self.header[key]
+
+    def to_df(self, dtype=None):
+        """
+        :param dtype: dtype of the DataFrame, the stored dtype when None
+        :return: rawData_df with columns Acc_X, Acc_Y, Acc_Z, Gyro_X, Gyro_Y, Gyro_Z, a view of the file when
+                 no conversion is needed
+        """
+        signals = self.signals if dtype is None else self.signals.astype(dtype, copy=False)
+        return pd.DataFrame(signals, columns=list(self.header["Columns"]), copy=False)
+
+    @classmethod
+    def from_event(cls, event, dtype="float32"):
+        """
+        :param event: event dict in the shape of Data/*.json
+        :return: EventFile in memory
+        """
+        columns = [event['Acc_X']['Data'], event['Acc_Y']['Data'], event['Acc_Z']['Data']] + \
+                  [sensor['Data'] for sensor in event['Sensors'][:3]]
+        data = np.array(columns, dtype=dtype)
+        header = {k: v for k, v in event.items() if k not in ('Acc_X', 'Acc_Y', 'Acc_Z', 'Sensors')}
+        header.update({"Columns": list(cls.COLUMNS), "Samples": data.shape[1], "Dtype": data.dtype.str})
+        return cls(header, data.T)
+
+    def save(self, path):
+        data = np.ascontiguousarray(self.signals.T)
+        header = dict(self.header, Columns=list(self.header["Columns"]), Samples=data.shape[1], Dtype=data.dtype.str)
+        header_bytes = json.dumps(header).encode('utf-8')
+        prefix = len(self.MAGIC) + 4 + len(header_bytes)
+        padding = -prefix % self.ALIGN
+        with open(path, 'wb') as f:
+            f.write(self.MAGIC)
+            f.write(struct.pack('<I', len(header_bytes)))
+            f.write(header_bytes)
+            f.write(b'\0' * padding)
+            f.write(data.tobytes())
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        :param mmap: memory-map the columns (read-only), otherwise read them into memory
+        :return: EventFile, signals is a [T, n_columns] view of the columns
+        """
+        with open(path, 'rb') as f:
+            if f.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise ValueError(f"{path} is not an event file")
+            header_len, = struct.unpack('<I', f.read(4))
+            header = json.loads(f.read(header_len).decode('utf-8'))
+        offset = len(cls.MAGIC) + 4 + header_len
+        offset += -offset % cls.ALIGN
+        shape = (len(header["Columns"]), header["Samples"])
+        if mmap:
+            data = np.memmap(path, dtype=header["Dtype"], mode='r', offset=offset, shape=shape)
+        else:
+            data = np.fromfile(path, dtype=header["Dtype"], count=shape[0] * shape[1], offset=offset).reshape(shape)
+        return cls(header, data.T)
+
+    @classmethod
+    def convert(cls, source, target_folder, dtype="float32"):
+        """
+        converts JSON events to event files
+        :param source: directory of *.json events or a single json file
+        :param target_folder: output directory, one <name>.evb per event
+        :return: list of the written paths
+        """
+        paths = sorted(glob.glob(os.path.join(source, '*.json'))) if os.path.isdir(source) else [source]
+        os.makedirs(target_folder, exist_ok=True)
+        written = []
+        for path in paths:
+            with open(path, 'r') as f:
+                event = json.load(f)
+            target = os.path.join(target_folder, os.path.splitext(os.path.basename(path))[0] + cls.EXTENSION)
+            cls.from_event(event, dtype).save(target)
+            written.append(target)
+        return written
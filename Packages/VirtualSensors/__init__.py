@@ -1 +1,2 @@
 from VirtualSensors.vs import VS
+from VirtualSensors.model_registry import VSModelRegistry
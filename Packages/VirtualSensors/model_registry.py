@@ -0,0 +1,119 @@
+import os
+import glob
+import time
+import threading
+import torch
+import architectures
+from Utils import IO, LogLevel, DSLogger
+
+
+class VSModelRegistry:
+    """
+    Process-wide store of the virtual sensors networks.
+    Every .pth file in Models/VirtualSensors_models is loaded once into a ready-built module (eval mode) and indexed
+    by crash mechanism, so VS only runs the forward passes per event.
+    With stacked_inference the nets are folded into the stacked nets and only those stay in memory.
+    """
+    __Registries = dict()  # static, one registry per base folder
+    __Lock = threading.Lock()
+
+    def __init__(self, base_folder):
+        self.logger = DSLogger("VirtualSensors_log")
+        self.base_folder = base_folder
+        self.package_name = os.path.split(os.path.dirname(__file__))[-1]
+        self.params = IO.read_config(self.base_folder, self.package_name)
+        self.device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
+        self.models = dict()  # mechanism -> [(model_path, net), ...], net None with stacked_inference
+        self.stacked_models = dict()  # mechanism -> [([model_path, ...], stacked_net), ...]
+        self.load_time = None
+        self.load()
+
+    @classmethod
+    def get(cls, base_folder):
+        """
+        :param base_folder: basefolder
+        :return: the registry of base_folder, loaded on first call
+        """
+        key = os.path.abspath(base_folder)
+        with cls.__Lock:
+            if key not in cls.__Registries:
+                cls.__Registries[key] = cls(base_folder)
+            return cls.__Registries[key]
+
+    @classmethod
+    def clear(cls):
+        with cls.__Lock:
+            cls.__Registries.clear()
+
+    def load(self):
+        self.logger.PrintLog(LogLevel.Info, "VirtualSensors registry: start loading models")
+        start = time.perf_counter()
+        models = glob.glob(os.path.join(self.base_folder, 'Models', 'VirtualSensors_models', '*.pth'))
+        for m in models:
+            mechanism = os.path.split(m)[-1].split('_')[0]
+            net_arch = self.params["architecture_hip"] if "HipVector" in m else self.params["architecture"]
+            net = eval('architectures.' + net_arch + '()')
+            net.load_state_dict(torch.load(m, map_location=lambda storage, loc: storage))
+            net.to(self.device)
+            net.eval()
+            self.models.setdefault(mechanism, []).append((m, net))
+        if self.params.get("stacked_inference", True):
+            self.stack_models()
+        self.load_time = time.perf_counter() - start
+        self.logger.PrintLog(LogLevel.Info, f"VirtualSensors registry: {self.stats()}")
+
+    def stack_models(self):
+        """
+        groups the nets of every mechanism by architecture and folds each group into a single stacked net,
+        so all the virtual sensors of an architecture are predicted in one forward pass;
+        the single nets are released, the stacked nets hold copies of their conv weights and reuse their LSTMs
+        """
+        for mechanism, mech_models in self.models.items():
+            self.stacked_models[mechanism] = []
+            for net_arch, is_hip in [(self.params["architecture_stacked"], False),
+                                     (self.params["architecture_hip_stacked"], True)]:
+                group = [(m, net) for m, net in mech_models if ("HipVector" in m) == is_hip]
+                if len(group) == 0:
+                    continue
+                stacked_net = eval('architectures.' + net_arch + '([net for _, net in group])')
+                stacked_net.to(self.device)
+                stacked_net.eval()
+                self.stacked_models[mechanism].append(([m for m, _ in group], stacked_net))
+            self.models[mechanism] = [(m, None) for m, _ in mech_models]
+
+    def get_models(self, mechanism):
+        """
+        :param mechanism: Frontal, Rear, SideLeft...
+        :return: [(model_path, net), ...] of the mechanism, empty list if there are no models for it;
+                 net is None with stacked_inference, see get_stacked_models
+        """
+        return self.models.get(mechanism, [])
+
+    def get_stacked_models(self, mechanism):
+        """
+        :param mechanism: Frontal, Rear, SideLeft...
+        :return: [([model_path, ...], stacked_net), ...] of the mechanism, empty list if there are no models for it
+        """
+        return self.stacked_models.get(mechanism, [])
+
+    def memory_footprint(self):
+        """
+        :return: bytes held by the parameters and buffers of all loaded nets
+        """
+        nets = [net for mech_models in self.models.values() for _, net in mech_models if net is not None]
+        nets += [net for mech_models in self.stacked_models.values() for _, net in mech_models]
+        n_bytes = 0
+        for net in nets:
+            n_bytes += sum(t.numel() * t.element_size() for t in net.parameters())
+            n_bytes += sum(t.numel() * t.element_size() for t in net.buffers())
+        return n_bytes
+
+    def stats(self):
+        """
+        :return: {"num_models": int, "models_per_mechanism": {mechanism: int}, "load_time_sec": float,
+                  "memory_bytes": int}
+        """
+        return {"num_models": sum(len(v) for v in self.models.values()),
+                "models_per_mechanism": {k: len(v) for k, v in self.models.items()},
+                "load_time_sec": self.load_time,
+                "memory_bytes": self.memory_footprint()}
@@ -1,68 +1,47 @@
 import os
-import architectures
 import torch
-from SignalProcessing import SignalProcessing as sp
-import glob
+from SignalProcessing import PreparedEvent
 import numpy as np
 import pandas as pd
 import traceback
 from Utils import IO, LogLevel, DSLogger
+from VirtualSensors.model_registry import VSModelRegistry
 
 
 class VS:
-    def __init__(self, base_folder, signal, calib_info_obj, crash_info_obj, OffSet):
+    def __init__(self, base_folder, signal, calib_info_obj, crash_info_obj, OffSet, prepared_event=None):
         self.logger = DSLogger("VirtualSensors_log")
         self.logger.PrintLog(LogLevel.Info, "VirtualSensors: module initialization")
         self.base_folder = base_folder
-        self.signal = signal.copy(deep=True)
-        self.op_matrix = np.array(calib_info_obj["OperationalMat"])
-        self.axes_directions = calib_info_obj["AxesOrientation"]
-        self.offset = OffSet
+        self.prepared_event = prepared_event if prepared_event is not None else \
+            PreparedEvent(signal, calib_info_obj, OffSet)
         self.mechanism = crash_info_obj["mechanism"]
         self.package_name = os.path.split(os.path.dirname(__file__))[-1]
         self.params = IO.read_config(self.base_folder, self.package_name)
-        self.net_arch = self.params['architecture']
-        self.net_arch_hip = self.params["architecture_hip"]
         self.SideRight = ({"1": "2", "4": "3"} if self.mechanism == "SideRight" else False)
-        self.device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
-
-    def get_net(self):
-        self.logger.PrintLog(LogLevel.Info, "Start getting nets")
-        self.net = eval('architectures.' + self.net_arch + '()').to(self.device)
-        self.net_hip = eval('architectures.' + self.net_arch_hip + '()').to(self.device)
-        self.logger.PrintLog(LogLevel.Info, "Nets were gotten")
+        self.registry = VSModelRegistry.get(self.base_folder)
+        self.device = self.registry.device
 
     def preprocess(self):
         self.logger.PrintLog(LogLevel.Info, "Start signal preprocess")
         fs = self.params['InFs']
         outFs = self.params['OutFs']
-        self.signal = self.signal[['Acc_X', 'Acc_Y', 'Acc_Z']]
-        self.signal = sp.rotate_signal(self.signal, self.op_matrix, output_orientation="FRD",
-                                       input_orientation=self.axes_directions, sensors=['Acc_X', 'Acc_Y', 'Acc_Z'],
-                                       offset=self.offset)
-
-        self.signal = self.signal.rename(columns={'Acc_X': 'X', 'Acc_Y': 'Y', 'Acc_Z': 'Z'})
-        self.signal["Z"] = self.signal["Z"].to_numpy() + 1
+        self.signal = self.prepared_event.aligned_array(self.params["signal_length"], self.params["cutoffFreq"], fs,
+                                                        outFs, columns=('X', 'Y', 'Z'), bias={"Z": 1})
         if self.mechanism == "SideRight":
-            self.signal = sp.align_axes(self.signal, input_orientation='FLD')
+            # FLD -> FRD, the filter and the alignment are sign symmetric so flipping Y afterwards is exact
+            self.signal = self.signal * np.array([1, -1, 1], dtype=self.signal.dtype)
             self.mechanism = "SideLeft"
-        self.signal = sp.insert_time_column(self.signal, sigFs=fs)
-        if outFs != fs:
-            self.signal, _ = sp.change_sampling_rate(self.signal, outFs=outFs)
-        self.signal = sp.smooth_dataset_filter(self.signal, cutoffFreq=self.params["cutoffFreq"])
-        self.signal = sp.alignment_signal(self.signal, size=self.params["signal_length"])
-        self.signal = self.signal.to_numpy()[:, 1:]
         self.signal = self.signal.reshape(-1, self.signal.shape[0], self.signal.shape[1]).transpose(0, 2, 1)
         self.logger.PrintLog(LogLevel.Info, "Finish signal preprocess")
 
     def load_models(self):
         self.logger.PrintLog(LogLevel.Info, "Start loading models")
-        models = [m for m in glob.glob(os.path.join(self.base_folder, 'Models', 'VirtualSensors_models',
-                                                    self.mechanism + '*.pth'))]
-        sensor_names = [''.join(os.path.split(m)[-1].split('_')[1:5])[:-4] for m in models]
+        models = self.registry.get_models(self.mechanism)
+        sensor_names = [''.join(os.path.split(m)[-1].split('_')[1:5])[:-4] for m, _ in models]
         sensor_names = self.sensors_translation(sensor_names)
         assert len(models) == len(sensor_names), "Number of the sensor names should be equal to the number of models"
-        self.models_list = zip(models, sensor_names)
+        self.models_list = [(m, net, name) for (m, net), name in zip(models, sensor_names)]
         self.dummies = set([i[1] for i in sensor_names])
         if self.SideRight:
             self.dummies = set(self.SideRight.values())
@@ -89,33 +68,46 @@ class VS:
         self.vs_df = dict()
         for i in self.dummies:
             self.vs_df["occ_" + i] = pd.DataFrame()
-        self.net.eval()
-        self.net_hip.eval()
         input = torch.from_numpy(self.signal).to(self.device).float()
-        for m, name in self.models_list:
+        with torch.no_grad():
+            if self.params.get("stacked_inference", True):
+                predictions = self.stacked_forward(input)
+            else:
+                predictions = {m: net(input) for m, net, _ in self.models_list}
+        for m, _, name in self.models_list:
             dummy = name[1]
             if self.SideRight:
                 dummy = self.SideRight[dummy]
             occ = "occ_" + dummy
             if "HipVector" not in name:
-                self.net.load_state_dict(torch.load(m, map_location=lambda storage, loc: storage))
-                prediction = self.net(input)
-                output = prediction.data.cpu().numpy()
+                output = predictions[m].data.cpu().numpy()
                 self.vs_df[occ][name[2:]] = np.squeeze(output)
             else:
-                self.net_hip.load_state_dict(torch.load(m, map_location=lambda storage, loc: storage))
-                prediction = self.net_hip(input)
-                output1, output2 = [pred.data.cpu().numpy() for pred in prediction]
+                output1, output2 = [pred.data.cpu().numpy() for pred in predictions[m]]
                 self.vs_df[occ][name[2:]] = np.squeeze(output1)
                 self.vs_df[occ]["BRIC"] = np.squeeze(output2)
         self.vs_df = {k: v.to_dict('list') for k, v in self.vs_df.items()}
         self.logger.PrintLog(LogLevel.Info, "Virtual sensors were predicted")
 
+    def stacked_forward(self, input):
+        """
+        runs every stacked net of the mechanism once
+        :return: {model_path: prediction} with the same shapes the single nets return
+        """
+        predictions = dict()
+        for models, stacked_net in self.registry.get_stacked_models(self.mechanism):
+            prediction = stacked_net(input)
+            for i, m in enumerate(models):
+                if isinstance(prediction, tuple):
+                    predictions[m] = tuple(pred[i] for pred in prediction)
+                else:
+                    predictions[m] = prediction[i]
+        return predictions
+
     def run(self):
         try:
             self.logger.PrintLog(LogLevel.Info, "VirtualSensors: run predictions")
             self.preprocess()
-            self.get_net()
             self.load_models()
             self.predict()
             return self.vs_df
@@ -0,0 +1,33 @@
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(".", os.pardir)))
+sys.path.append(os.path.join(".", 'Packages'))
+sys.path.append(os.path.join(".", 'Architectures'))
+
+from Packages.ImpactPipeline import BatchRunner
+
+# Batch impact prediction:
+#   python batch_run.py Data outputs/impactData.jsonl --workers 4          (directory of event json files)
+#   python batch_run.py events.jsonl outputs/impactData.jsonl              (one event json per line)
+#   python batch_run.py DataBin outputs/impactData.jsonl                   (.evb event files of convert_events.py)
+# Every worker process loads the models once, results are streamed as one JSON line per event.
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel batch impact prediction")
+    parser.add_argument("source", help="directory of *.json / *.evb events or a .jsonl file")
+    parser.add_argument("output", help="output .jsonl path")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, default: cpu count")
+    parser.add_argument("--torch-threads", type=int, default=1, help="torch intra-op threads per worker")
+    parser.add_argument("--triage", action="store_true", help="skip the heavy stages for non-crash / invalid events")
+    parser.add_argument("--dtype", default="float32", help="signal processing / model input dtype")
+    parser.add_argument("--no-validity-gate", dest="validity_gate", action="store_false",
+                        help="do not run IsValid before the models, invalid events run every stage")
+    parser.add_argument("--output-mode", default="full", choices=["full", "float32", "quantized", "summary"],
+                        help="impactData signals: full, float32, rounded (quantized) or left out (summary)")
+    args = parser.parse_args()
+
+    BatchRunner(".", workers=args.workers, torch_threads=args.torch_threads, triage=args.triage,
+                dtype=args.dtype, output_mode=args.output_mode,
+                validity_gate=args.validity_gate).run(args.source, args.output)
@@ -0,0 +1,23 @@
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(".", os.pardir)))
+sys.path.append(os.path.join(".", 'Packages'))
+sys.path.append(os.path.join(".", 'Architectures'))
+
+from Packages.Utils import EventFile
+
+# JSON events to binary event files (.evb), memory-mapped by the pipeline / batch_run.py:
+#   python convert_events.py Data DataBin                     (every *.json of Data, float32)
+#   python convert_events.py Data/event.json DataBin --dtype float64
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert JSON events to binary event files")
+    parser.add_argument("source", help="directory of *.json events or a single json file")
+    parser.add_argument("target", help="output directory of the .evb files")
+    parser.add_argument("--dtype", default="float32", help="stored signal dtype")
+    args = parser.parse_args()
+
+    for path in EventFile.convert(args.source, args.target, args.dtype):
+        print(path)
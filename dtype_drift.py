@@ -0,0 +1,30 @@
+import os
+import sys
+import json
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(".", os.pardir)))
+sys.path.append(os.path.join(".", 'Packages'))
+sys.path.append(os.path.join(".", 'Architectures'))
+
+from Packages.ImpactPipeline.dtype_drift import dtype_drift_report
+
+# Numerical drift of the pipeline dtype against the float64 path on the sample events:
+#   python dtype_drift.py                                  (float32 vs float64 on Data/, report in outputs/)
+#   python dtype_drift.py --data Data --dtype float32 --output outputs/dtype_drift.json
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline output drift of a dtype against float64")
+    parser.add_argument("--data", default="Data", help="directory of *.json events")
+    parser.add_argument("--dtype", default="float32", help="dtype under test")
+    parser.add_argument("--output", default=os.path.join("outputs", "dtype_drift.json"), help="report path")
+    args = parser.parse_args()
+
+    report = dtype_drift_report(".", args.data, args.dtype)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
+    for name, event in report["Events"].items():
+        print(f"{name}: max rel {event['MaxRel']:.3g} over {event['Numeric']} values, "
+              f"{len(event['Mismatches'])} mismatches")
+    print(f"max rel {report['MaxRel']:.3g}, events with mismatches: {report['EventsWithMismatches']}")
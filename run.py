@@ -1,7 +1,4 @@
 import json
-import numpy as np
-import matplotlib.pyplot as plt
-import pandas as pd
 import os
 import sys
 
@@ -9,12 +6,7 @@ sys.path.append(os.path.abspath(os.path.join(".",os.pardir)))
 sys.path.append(os.path.join(".", 'Packages'))
 sys.path.append(os.path.join(".", 'Architectures'))
 
-from Packages.CrashDetection import CrashDetection, InjuryLevel
-from Packages.VirtualSensors import VS
-from Packages.MedicalCalculation import MedicalFormulationCalculation, FarSideMitigationCalculation
-from Packages.Damages import DamagesPrediction
-from Packages.SignalProcessing import SignalProcessing
-from Packages.AirBagDeploy import airbag_deploy
+from Packages.ImpactPipeline import ImpactPipeline, ImpactDataEncoder
    
 folder_name = 'Data/'
 
@@ -27,119 +19,20 @@ file_name = "EV63fe8da1467e4bfb172ba3c4.json" #
 # file_name = "EV62e5f7c7214dc35247117289.json" #
 # file_name = "EV635c45180717502673c60545.json" # 
 
+# impactData_full.json as full / float32 / quantized / summary / sidecar, see ImpactDataEncoder
+output_mode = "full"
+
+# IsValid before any model, an invalid signal skips every stage (impactData then only has rawData, IsValid and
+# SkippedStages)
+validity_gate = True
+
 # Load JSON data
 with open(folder_name + file_name, 'r') as f:
     data = json.load(f)
 
-# Extract accelerometer data and time
-acc_x = np.array(data['Acc_X']['Data'])
-acc_y = np.array(data['Acc_Y']['Data'])
-acc_z = np.array(data['Acc_Z']['Data'])
-
-# data to df
-Acc_X=data['Acc_X']['Data']
-Acc_Y=data['Acc_Y']['Data']
-Acc_Z=data['Acc_Z']['Data']
-gyr_x = data['Sensors'][0]['Data']
-gyr_y = (data['Sensors'][1]["Data"])
-gyr_z = (data['Sensors'][2]["Data"])
-rawData_df = pd.DataFrame(np.array([Acc_X,Acc_Y,Acc_Z,gyr_x,gyr_y,gyr_z]).T, columns=["Acc_X","Acc_Y","Acc_Z",'Gyro_X', 'Gyro_Y', 'Gyro_Z'])
-
-
-calibInfo = {
-    #creating unit matrix for aligned signal
-    "OperationalMat": np.eye(3),
-    "AxesOrientation": "FLU" }
-
-
-offset = [0,0,0]
-impactData = {}
-
-impactData['rawData'] = rawData_df.to_dict(orient='list')
-
-# Crash Detection
-crashDetectionObj = CrashDetection(".", rawData_df, calibInfo, offset)
-crashDict = crashDetectionObj.run() #running crash detection
-
-isCrash, reason = crashDict.get('isCrash')
-mechanism = crashDict.get("mechanism")
-
-impactData['IsCrash'] = isCrash
-impactData['Dv'] = crashDict.get('DV')
-impactData['MaxG'] = crashDict.get('maxG')
-
-if isCrash:
-    impactData['Confidence'] = crashDict.get('confidence')
-    impactData['Theta'] = crashDict.get('theta')
-    impactData['Mechanism'] = mechanism
-else:
-    impactData['Mechanism'] = "No Crash"
-
-# Virtual Sensors
-vs = VS(".", rawData_df, calibInfo, crashDict, offset)
-occpVsDict = vs.run()
-#impactData['VirtualSensors'] = occpVsDict
-
-# Air Bag deployment
-ab_deploy = airbag_deploy.AirBagDeploy(".", rawData_df, calibInfo, crashDict, offset)
-ab_deployObj = ab_deploy.run()
-impactData['AirBagDeploy'] = ab_deployObj
-
-# Damages
-damagesObj = DamagesPrediction(".", rawData_df, calibInfo, crashDict, offset)
-damagesResult = damagesObj.run()
-
-impactData['Damages'] = {}
-impactData['Damages'] = damagesResult.get('final')
-
-# Injuries
-injuryLevelObj = InjuryLevel(".", rawData_df, calibInfo, crashDict, offset)
-injuryLevelData = injuryLevelObj.run()
-occpDict = impactData['Occupants'] = {}
-# run medical criteria for each known occupant
-for occKey, occVS in occpVsDict.items():
-    occLocation = occKey.split('_')[1]  # get the location
-    occpDict[occLocation] = {}
-    occpDict[occLocation]['VirtualSensors'] = occVS
-    mfc = MedicalFormulationCalculation(mechanism, occVS)
-    medicalDict = mfc.Run()
-    occpDict[occLocation]['MedicalCriteria'] = medicalDict
-
-
-def CalcOccFarSideMitigation(occDict, knownOcc, unknownOcc):
-    if occDict is None:
-        raise ValueError("occDict is not defined.")
-    if knownOcc is None:
-        raise ValueError("knownOcc is not defined.")
-    if unknownOcc is None:
-        raise ValueError("unknownOcc is not defined.")
-
-    try:
-        # get known medical criteria
-        if knownOcc in occDict.keys():
-            medCriteria = occDict[knownOcc].get('MedicalCriteria')
-            # calculate FarSideMitigation for unknown occupant
-            fsmc = FarSideMitigationCalculation(mechanism, int(unknownOcc), medCriteria)
-            farSideDict = fsmc.Run()
-            occDict[unknownOcc] = {'MedicalCriteria': farSideDict}
-        else:
-            raise Exception(f"Occupant {knownOcc} is missing medical criteria.")
-    except Exception as ex:
-        msg = ex.message if hasattr(ex, 'message') else str(ex.args)
-        raise Exception(f"Error while calculating far side mitigation: {msg}")
-
-
-# run FarSideMitigation only for Side crash
-if mechanism == "SideLeft":
-    CalcOccFarSideMitigation(occpDict, "1", "2")
-    CalcOccFarSideMitigation(occpDict, "4", "3")
-elif mechanism == "SideRight":
-    CalcOccFarSideMitigation(occpDict, "2", "1")
-    CalcOccFarSideMitigation(occpDict, "3", "4")
-    
-# run Post Process calculations for each occupant
-for occVal in occpDict.values():
-    MedicalFormulationCalculation.run_post_processing_summary(occVal["MedicalCriteria"])
+# validity gate -> crash detection -> virtual sensors -> airbag -> damages -> medical criteria
+with ImpactPipeline(".", validity_gate=validity_gate) as pipeline:
+    impactData = pipeline.run(data)
 
 
 # Function to save impactData to JSON files
@@ -150,8 +43,7 @@ def save_impact_data(impactData):
         os.makedirs(output_dir)
 
     # 1. Save the whole impactData dictionary
-    with open(os.path.join(output_dir, "impactData_full.json"), "w") as f:
-        json.dump(impactData, f, indent=4)
+    ImpactDataEncoder(output_mode, indent=True).save(impactData, os.path.join(output_dir, "impactData_full.json"))
 
 # Call the function to save data
 save_impact_data(impactData)
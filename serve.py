@@ -0,0 +1,27 @@
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(".", os.pardir)))
+sys.path.append(os.path.join(".", 'Packages'))
+sys.path.append(os.path.join(".", 'Architectures'))
+
+from Packages.ImpactPipeline import ImpactService
+
+# Warm impact service:
+#   python serve.py --port 8080                       (HTTP)
+#   python serve.py --unix-socket /tmp/impact.sock    (Unix socket)
+# POST an event JSON (same shape as Data/*.json) to /impact to get its impactData, GET /health for model info.
+
+parser = argparse.ArgumentParser(description="Long-lived impact prediction service")
+parser.add_argument("--host", default="127.0.0.1")
+parser.add_argument("--port", type=int, default=8080)
+parser.add_argument("--unix-socket", default=None, help="listen on this Unix socket path instead of TCP")
+parser.add_argument("--triage", action="store_true", help="skip the heavy stages for non-crash / invalid events")
+parser.add_argument("--dtype", default="float32", help="signal processing / model input dtype")
+parser.add_argument("--no-validity-gate", dest="validity_gate", action="store_false",
+                    help="do not run IsValid before the models, invalid events run every stage")
+args = parser.parse_args()
+
+ImpactService(".", host=args.host, port=args.port, unix_socket=args.unix_socket, triage=args.triage,
+              dtype=args.dtype, validity_gate=args.validity_gate).serve_forever()